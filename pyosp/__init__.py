@@ -8,5 +8,10 @@ from .util import *
 from ._elevation import *
 from ._slope import *
 from ._tpi import *
+from ._raster import *
+from ._instrument import *
+from ._ragged import *
+from ._stats import *
+from ._cache import *
 
 import pyosp.datasets
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import numpy as np
+
+__all__ = ["Result_cache"]
+
+# bump when the stored arrays change meaning
+CACHE_VERSION = 1
+
+
+class Result_cache:
+    """Directory of computed swath profiles, reused across runs.
+
+    Each entry is an uncompressed .npz file named by a hash of the raster
+    identity, the baseline or center geometry, the class and its
+    parameters. The least recently used entries are removed once the
+    directory grows over max_bytes.
+
+    :param directory: cache directory, created if missing
+    :type directory: str
+    :param max_bytes: size budget of the directory in bytes, defaults to 1 GB
+    :type max_bytes: int, optional
+    """
+
+    suffix = ".npz"
+
+    def __init__(self, directory, max_bytes=2 ** 30):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __repr__(self):
+        return "{}({!r}, max_bytes={})".format(
+            self.__class__.__name__, self.directory, self.max_bytes
+        )
+
+    def key(self, raster_path, geometry, name, params):
+        """Return the key of a swath profile.
+
+        :param raster_path: path to the raster, identified by its absolute
+            path, size and modification time
+        :type raster_path: str
+        :param geometry: baseline or center
+        :type geometry: shapely geometry
+        :param name: class name
+        :type name: str
+        :param params: parameters the result depends on
+        :type params: dict
+        :rtype: str
+        """
+        stat = os.stat(raster_path)
+        digest = hashlib.sha1()
+        for part in [
+            CACHE_VERSION,
+            os.path.abspath(raster_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            name,
+            sorted((k, repr(v)) for k, v in params.items()),
+        ]:
+            digest.update(repr(part).encode())
+        digest.update(geometry.wkb)
+        return digest.hexdigest()
+
+    def path(self, key):
+        "Return the file of an entry."
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        """Return the arrays stored for key, None if there are none.
+
+        :param key: key of the entry
+        :type key: str
+        :rtype: dict of ndarray or None
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        return arrays
+
+    def save(self, key, arrays):
+        """Store arrays for key, then evict entries over the size budget.
+
+        :param key: key of the entry
+        :type key: str
+        :param arrays: arrays to store
+        :type arrays: dict of array-like
+        """
+        path = self.path(key)
+        # write aside then rename, so readers never load a partial file
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        "Return paths, sizes and access times of entries, least recent first."
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, path, stat.st_size))
+
+        return [(path, size, mtime) for mtime, path, size in sorted(entries)]
+
+    @property
+    def nbytes(self):
+        "Size of all entries in bytes."
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        "Remove the least recently used entries until within max_bytes."
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        "Remove all entries."
+        for path, _, _ in self.entries():
+            os.remove(path)
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import os
+import numpy as np
+from ._instrument import Run_stats
+from ._raster import Tile_cache
+
 
 class Point_elevation:
     """Get point elevation by given raster.
@@ -24,3 +29,167 @@ class Point_elevation:
     def value(self):
         px, py = self.point_position()
         return self.raster.ReadAsArray(px, py, 1, 1).astype(float)
+
+
+class Raster_sampler:
+    """Sample raster values at many points in one vectorized pass.
+
+    Points falling outside of the raster are returned as NaN. Rasters kept in
+    memory keep their data type, only sampled values are cast to float.
+
+    :param raster: GeoRaster read by GDAL
+    :type raster: GDAL dataset
+    :param in_memory: keep the whole raster in memory after the first read,
+        otherwise read the window covering each batch of points, defaults to
+        None that keeps rasters up to max_bytes in memory and reads larger ones
+        through a block cache of max_bytes
+    :type in_memory: bool, optional
+    :param cache: read through a block cache instead, defaults to None
+    :type cache: Tile_cache, optional
+    :param memmap: map the raster read-only from a .npy sidecar, created on
+        first use, True for the sidecar next to the raster file, defaults to None
+    :type memmap: str or bool, optional
+    :param run_stats: record raster reads and sampled points into it, defaults
+        to a new Run_stats
+    :type run_stats: Run_stats, optional
+    :param max_bytes: size of the largest raster kept in memory by default,
+        and budget of the block cache of larger ones, defaults to 256 MB
+    :type max_bytes: int, optional
+    """
+
+    def __init__(
+        self,
+        raster,
+        in_memory=None,
+        cache=None,
+        memmap=None,
+        run_stats=None,
+        max_bytes=256 * 2 ** 20,
+    ):
+        self.raster = raster
+        self.run_stats = Run_stats() if run_stats is None else run_stats
+        self.geoTransform = raster.GetGeoTransform()
+        self.cols = raster.RasterXSize
+        self.rows = raster.RasterYSize
+        if memmap is True:
+            memmap = raster.GetDescription() + ".npy"
+        self.memmap = memmap or None
+
+        # large rasters are read block by block, unless mapped from a sidecar
+        if in_memory is None:
+            itemsize = raster.GetRasterBand(1).ReadAsArray(0, 0, 1, 1).itemsize
+            in_memory = self.cols * self.rows * itemsize <= max_bytes
+            if not in_memory and cache is None and self.memmap is None:
+                cache = Tile_cache(raster, max_bytes, run_stats=self.run_stats)
+        self.cache = cache
+        self.in_memory = (in_memory or self.memmap is not None) and cache is None
+        self._array = None
+
+    @property
+    def array(self):
+        "Raster values of the raster data type, read once or mapped from the sidecar."
+        if self._array is None:
+            if self.memmap is not None:
+                self._array = raster_memmap(self.raster, self.memmap)
+            else:
+                self._array = self.raster.ReadAsArray()
+                self.run_stats.add_read(self._array)
+        return self._array
+
+    def point_position(self, points):
+        """Return row and column indices of points, and whether they are on the raster.
+
+        :param points: point coordinates
+        :type points: (N, 2) array-like
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x = (points[:, 0] - self.geoTransform[0]) / self.geoTransform[1]
+        y = (self.geoTransform[3] - points[:, 1]) / -self.geoTransform[5]
+
+        # truncate toward zero, the same as int() in Point_elevation
+        inside = np.isfinite(x) & np.isfinite(y)
+        px = np.zeros(len(points), dtype=np.int64)
+        py = np.zeros(len(points), dtype=np.int64)
+        px[inside] = x[inside].astype(np.int64)
+        py[inside] = y[inside].astype(np.int64)
+        inside &= (px >= 0) & (px < self.cols) & (py >= 0) & (py < self.rows)
+
+        return py, px, inside
+
+    def read(self, xoff, yoff, xsize, ysize):
+        "Return a window of the raster as a float array."
+        if self.cache is not None:
+            return self.cache.read(xoff, yoff, xsize, ysize)
+        if self.in_memory:
+            return self.array[yoff : yoff + ysize, xoff : xoff + xsize].astype(float)
+        arr = self.raster.ReadAsArray(xoff, yoff, xsize, ysize)
+        self.run_stats.add_read(arr)
+        return arr.astype(float)
+
+    def values(self, points):
+        """Return raster values of points.
+
+        :param points: point coordinates
+        :type points: (N, 2) array-like
+        :return: raster values
+        :rtype: (N,) ndarray
+        """
+        py, px, inside = self.point_position(points)
+        self.run_stats.add_points(len(py))
+        out = np.full(len(py), np.nan)
+        if not inside.any():
+            return out
+
+        py, px = py[inside], px[inside]
+        if self.cache is not None:
+            out[inside] = self.cache.take(py, px)
+        elif self.in_memory:
+            out[inside] = self.array[py, px]
+        else:
+            xmin, ymin = px.min(), py.min()
+            window = self.read(xmin, ymin, px.max() - xmin + 1, py.max() - ymin + 1)
+            out[inside] = window[py - ymin, px - xmin]
+
+        return out
+
+    def value(self, point):
+        "Return raster value of a single point."
+        return self.values(point)[0]
+
+
+def raster_memmap(raster, path):
+    """Map the first band of raster read-only from a .npy sidecar.
+
+    The sidecar keeps the raster data type and is written block by block on
+    first use, or again if the raster file is newer. Processes mapping the
+    same sidecar share one copy of it in the page cache.
+
+    :param raster: GeoRaster read by GDAL
+    :type raster: GDAL dataset
+    :param path: path to the .npy sidecar
+    :type path: str
+    :return: raster values
+    :rtype: read-only numpy.memmap
+    """
+    source = raster.GetDescription()
+    stale = not os.path.exists(path) or (
+        os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(path)
+    )
+    if stale:
+        band = raster.GetRasterBand(1)
+        dtype = band.ReadAsArray(0, 0, 1, 1).dtype
+        # write aside then rename, so other processes never map a partial file
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        out = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=dtype, shape=(raster.RasterYSize, raster.RasterXSize)
+        )
+        cols = raster.RasterXSize
+        rows = max(band.GetBlockSize()[1], 2 ** 20 // max(cols, 1))
+        for yoff in range(0, raster.RasterYSize, rows):
+            ysize = min(rows, raster.RasterYSize - yoff)
+            out[yoff : yoff + ysize] = band.ReadAsArray(0, yoff, cols, ysize)
+        out.flush()
+        del out
+        os.replace(tmp, path)
+
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+__all__ = ["Run_stats"]
+
+
+class Run_stats:
+    """Runtime statistics of swath profiles.
+
+    Record the wall time and number of calls of each phase, the raster reads
+    and their bytes, and the number of points sampled. Phases may be nested,
+    the time of a phase includes the phases run within it.
+
+    One object can be shared by several swath profiles to add up their runs.
+    """
+
+    def __init__(self):
+        self.phase_time = OrderedDict()
+        self.phase_calls = OrderedDict()
+        self.reads = 0
+        self.read_bytes = 0
+        self.points = 0
+
+    def __repr__(self):
+        phases = ", ".join(
+            "{}={:.3f}s".format(name, sec) for name, sec in self.phase_time.items()
+        )
+        return "{}({}, reads={}, read_bytes={}, points={})".format(
+            self.__class__.__name__, phases, self.reads, self.read_bytes, self.points
+        )
+
+    @contextmanager
+    def phase(self, name):
+        "Time a phase, used as ``with stats.phase(name):``"
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phase_time[name] = self.phase_time.get(name, 0.0) + elapsed
+            self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+
+    def add_read(self, arr):
+        "Count a raster read returning arr."
+        self.reads += 1
+        self.read_bytes += arr.nbytes
+
+    def add_points(self, n):
+        "Count n sampled points."
+        self.points += int(n)
+
+    def merge(self, other):
+        "Add the statistics of another Run_stats."
+        for name, sec in other.phase_time.items():
+            self.phase_time[name] = self.phase_time.get(name, 0.0) + sec
+            self.phase_calls[name] = (
+                self.phase_calls.get(name, 0) + other.phase_calls[name]
+            )
+        self.reads += other.reads
+        self.read_bytes += other.read_bytes
+        self.points += other.points
+        return self
+
+    def reset(self):
+        "Clear all statistics."
+        self.phase_time.clear()
+        self.phase_calls.clear()
+        self.reads = self.read_bytes = self.points = 0
+
+    def as_dict(self):
+        "Return the statistics as a dictionary."
+        return {
+            "phase_time": dict(self.phase_time),
+            "phase_calls": dict(self.phase_calls),
+            "reads": self.reads,
+            "read_bytes": self.read_bytes,
+            "points": self.points,
+        }
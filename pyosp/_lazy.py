@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+
+
+class Lazy_module:
+    """Module imported on first attribute access.
+
+    Plotting modules are only needed by plotting methods, so swath profiles
+    built in worker processes never load matplotlib or pick its backend.
+
+    :param name: full name of the module
+    :type name: str
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self._name)
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from .util import pairwise
+
+
+def parallel_chunks(profile, worker, num, n_jobs=None, executor=None):
+    """Run worker over chunks of num items of a swath profile in parallel.
+
+    worker(profile, start, stop) returns its result and the Run_stats it
+    recorded into. Each chunk is sent with a pickled copy of the profile,
+    which opens its own GDAL handle. Run statistics are merged into the
+    profile and progress is reported as chunks finish.
+
+    Chunks must run in other processes, the GDAL handle, block caches and run
+    statistics of a profile are not safe to share between threads.
+
+    :param profile: curvilinear or circular swath profile
+    :param worker: picklable function run on each chunk
+    :type worker: callable
+    :param num: number of items
+    :type num: int
+    :param n_jobs: number of processes, defaults to the number of CPUs
+    :type n_jobs: int, optional
+    :param executor: executor running the chunks in processes instead of a
+        new process pool, not a ThreadPoolExecutor, defaults to None
+    :type executor: concurrent.futures.Executor, optional
+    :return: start of each chunk and its result, in order
+    :rtype: generator of tuple
+    """
+    if isinstance(executor, ThreadPoolExecutor):
+        raise TypeError("executor should run chunks in processes, not threads")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    bounds = np.unique(np.linspace(0, num, n_jobs + 1).astype(int))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(n_jobs)
+    try:
+        futures = [
+            executor.submit(worker, profile, start, stop)
+            for start, stop in pairwise(bounds)
+        ]
+        for future, start, stop in zip(futures, bounds[:-1], bounds[1:]):
+            result, run_stats = future.result()
+            profile.run_stats.merge(run_stats)
+            profile._progress(stop, num)
+            yield start, result
+    finally:
+        if own_executor:
+            executor.shutdown()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+__all__ = ["Ragged_swath"]
+
+
+class Ragged_swath:
+    """Profilelines of a swath profile stored as flat arrays.
+
+    Points and values of all profilelines are concatenated, profileline i
+    holds rows ``offsets[i]`` to ``offsets[i + 1]`` (compressed sparse row
+    layout), so each point costs three floats instead of Python objects.
+
+    :param xy: point coordinates
+    :type xy: (N, 2) array
+    :param offsets: start of each profileline, followed by N
+    :type offsets: (S + 1,) array of int
+    :param base_index: position of the baseline point within each profileline,
+        -1 if the profileline does not include it
+    :type base_index: (S,) array of int
+    :param values: values of points, defaults to NaN
+    :type values: (N,) array, optional
+    """
+
+    def __init__(self, xy, offsets, base_index, values=None):
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.base_index = np.asarray(base_index, dtype=np.int64)
+        if values is None:
+            values = np.full(len(self.xy), np.nan)
+        self.values = np.asarray(values, dtype=float)
+
+    def __repr__(self):
+        return "{}(lines={}, points={})".format(
+            self.__class__.__name__, len(self), len(self.xy)
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self):
+        "Number of points of each profileline."
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        "Memory used by the arrays in bytes."
+        return sum(
+            arr.nbytes for arr in (self.xy, self.values, self.offsets, self.base_index)
+        )
+
+    def line(self, i):
+        "Return point coordinates of profileline i."
+        return self.xy[self.offsets[i] : self.offsets[i + 1]]
+
+    def line_values(self, i):
+        "Return values of profileline i."
+        return self.values[self.offsets[i] : self.offsets[i + 1]]
+
+    def take(self, start=None, stop=None):
+        "Return profilelines start to stop as a new Ragged_swath, sharing memory."
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        lo, hi = self.offsets[start], self.offsets[stop]
+        return Ragged_swath(
+            self.xy[lo:hi],
+            self.offsets[start : stop + 1] - lo,
+            self.base_index[start:stop],
+            self.values[lo:hi],
+        )
+
+    def arrays(self):
+        "Return the arrays of the swath by name, as stored in files."
+        return {
+            "xy": self.xy,
+            "offsets": self.offsets,
+            "base_index": self.base_index,
+            "values": self.values,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        "Return a Ragged_swath from arrays returned by arrays()."
+        return cls(
+            arrays["xy"], arrays["offsets"], arrays["base_index"], arrays["values"]
+        )
+
+    @classmethod
+    def concatenate(cls, parts):
+        "Join Ragged_swath objects one after another."
+        parts = list(parts)
+        if not parts:
+            return cls(np.empty((0, 2)), [0], [])
+
+        ends = np.cumsum([len(part.xy) for part in parts])
+        offsets = [parts[0].offsets[:1]] + [
+            part.offsets[1:] + end - len(part.xy) for part, end in zip(parts, ends)
+        ]
+        return cls(
+            np.concatenate([part.xy for part in parts]),
+            np.concatenate(offsets),
+            np.concatenate([part.base_index for part in parts]),
+            np.concatenate([part.values for part in parts]),
+        )
+
+    def to_lines(self, base_points=None):
+        """Return profilelines as nested lists of points.
+
+        :param base_points: baseline point of each profileline, put in place of
+            its coordinates, as tuples mark them in the nested lists
+        :type base_points: list, optional
+        """
+        points = self.xy.tolist()
+        lines = []
+        for i in range(len(self)):
+            line = points[self.offsets[i] : self.offsets[i + 1]]
+            if base_points is not None and self.base_index[i] >= 0:
+                line[self.base_index[i]] = base_points[i]
+            lines.append(line)
+
+        return lines
+
+    def to_dat(self):
+        "Return values as nested lists, one list per profileline."
+        values = self.values.tolist()
+        return [values[lo:hi] for lo, hi in zip(self.offsets[:-1], self.offsets[1:])]
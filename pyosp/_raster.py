@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from ._instrument import Run_stats
+
+__all__ = ["Tile_grid", "Tile_cache"]
+
+
+class Tile_grid:
+    """Least-recently-used cache of raster-sized grids, evaluated tile by tile.
+
+    Subclasses implement ``compute`` for a pixel window; tiles are computed on
+    first access and the least recently used ones are dropped once the cache
+    exceeds ``max_bytes``.
+
+    :param cols: number of columns of the grid
+    :type cols: int
+    :param rows: number of rows of the grid
+    :type rows: int
+    :param tile_xsize: tile width in pixels
+    :type tile_xsize: int
+    :param tile_ysize: tile height in pixels
+    :type tile_ysize: int
+    :param max_bytes: memory budget of cached tiles in bytes, defaults to 256 MB
+    :type max_bytes: int, optional
+    :param run_stats: record the time computing tiles into it, defaults to a new
+        Run_stats
+    :type run_stats: Run_stats, optional
+    """
+
+    # name of the phase computing tiles in Run_stats
+    phase = "tiles"
+
+    def __init__(
+        self,
+        cols,
+        rows,
+        tile_xsize,
+        tile_ysize,
+        max_bytes=256 * 2 ** 20,
+        run_stats=None,
+    ):
+        self.run_stats = Run_stats() if run_stats is None else run_stats
+        self.cols = cols
+        self.rows = rows
+        self.tile_xsize = min(tile_xsize, cols)
+        self.tile_ysize = min(tile_ysize, rows)
+        self.ntiles_x = -(-cols // self.tile_xsize)
+        self.max_bytes = max_bytes
+
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+        # tiles may be requested by several threads
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "{}(tiles={}, nbytes={}, hits={}, misses={})".format(
+            self.__class__.__name__,
+            len(self._tiles),
+            self.nbytes,
+            self.hits,
+            self.misses,
+        )
+
+    def compute(self, xoff, yoff, xsize, ysize):
+        """
+        Depend on different grids
+        """
+        pass
+
+    def tile(self, tx, ty):
+        "Return the tile at tile column tx and tile row ty as a float array."
+        key = (tx, ty)
+        with self._lock:
+            if key in self._tiles:
+                self.hits += 1
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+            self.misses += 1
+
+        xoff = tx * self.tile_xsize
+        yoff = ty * self.tile_ysize
+        xsize = min(self.tile_xsize, self.cols - xoff)
+        ysize = min(self.tile_ysize, self.rows - yoff)
+        with self.run_stats.phase(self.phase):
+            arr = self.compute(xoff, yoff, xsize, ysize)
+
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = arr
+                self.nbytes += arr.nbytes
+            # always keep the latest tile, even if it is over budget
+            while self.nbytes > self.max_bytes and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+        return arr
+
+    def clear(self):
+        "Drop all cached tiles and reset the counters."
+        with self._lock:
+            self._tiles.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+    def read(self, xoff, yoff, xsize, ysize):
+        "Return a window of the grid as a float array."
+        out = np.empty((ysize, xsize))
+        tx0, tx1 = xoff // self.tile_xsize, (xoff + xsize - 1) // self.tile_xsize
+        ty0, ty1 = yoff // self.tile_ysize, (yoff + ysize - 1) // self.tile_ysize
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                arr = self.tile(tx, ty)
+                x0 = tx * self.tile_xsize
+                y0 = ty * self.tile_ysize
+                # overlap of the tile and the window, in raster pixels
+                xmin, xmax = max(xoff, x0), min(xoff + xsize, x0 + arr.shape[1])
+                ymin, ymax = max(yoff, y0), min(yoff + ysize, y0 + arr.shape[0])
+                out[ymin - yoff : ymax - yoff, xmin - xoff : xmax - xoff] = arr[
+                    ymin - y0 : ymax - y0, xmin - x0 : xmax - x0
+                ]
+
+        return out
+
+    def take(self, py, px):
+        """Return grid values at pixel indices, visiting each tile once.
+
+        :param py: row indices
+        :type py: array of int
+        :param px: column indices
+        :type px: array of int
+        """
+        py = np.asarray(py, dtype=np.int64)
+        px = np.asarray(px, dtype=np.int64)
+        out = np.empty(len(py))
+        if len(py) == 0:
+            return out
+
+        tx = px // self.tile_xsize
+        ty = py // self.tile_ysize
+        keys = ty * self.ntiles_x + tx
+        order = np.argsort(keys, kind="stable")
+        _, starts = np.unique(keys[order], return_index=True)
+        for idx in np.split(order, starts[1:]):
+            i = idx[0]
+            arr = self.tile(tx[i], ty[i])
+            out[idx] = arr[
+                py[idx] - ty[i] * self.tile_ysize, px[idx] - tx[i] * self.tile_xsize
+            ]
+
+        return out
+
+
+class Tile_cache(Tile_grid):
+    """Least-recently-used cache of native raster blocks.
+
+    Blocks are read with the block size of the raster (strips of striped
+    GeoTIFFs are grouped to at least ``min_tile`` rows), and the least
+    recently used ones are dropped once the cache exceeds ``max_bytes``.
+
+    :param raster: GeoRaster read by GDAL
+    :type raster: GDAL dataset
+    :param max_bytes: memory budget of cached blocks in bytes, defaults to 256 MB
+    :type max_bytes: int, optional
+    :param min_tile: minimal edge of cached tiles in pixels, defaults to 256
+    :type min_tile: int, optional
+    :param run_stats: record raster reads into it, defaults to a new Run_stats
+    :type run_stats: Run_stats, optional
+    """
+
+    phase = "read"
+
+    def __init__(
+        self, raster, max_bytes=256 * 2 ** 20, min_tile=256, run_stats=None
+    ):
+        self.band = raster.GetRasterBand(1)
+
+        # group native blocks into tiles aligned with block boundaries
+        block_xsize, block_ysize = self.band.GetBlockSize()
+        super(Tile_cache, self).__init__(
+            raster.RasterXSize,
+            raster.RasterYSize,
+            block_xsize * max(1, min_tile // block_xsize),
+            block_ysize * max(1, min_tile // block_ysize),
+            max_bytes,
+            run_stats,
+        )
+
+    def compute(self, xoff, yoff, xsize, ysize):
+        arr = self.band.ReadAsArray(xoff, yoff, xsize, ysize)
+        self.run_stats.add_read(arr)
+        return arr.astype(float)
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+import numpy as np
+
+__all__ = ["swath_stats", "padded_matrix", "Station_sketch", "Value_histogram"]
+
+
+def padded_matrix(values, offsets):
+    """Return ragged rows stored flat as a NaN-padded matrix.
+
+    :param values: values of all rows, concatenated
+    :type values: (N,) array-like
+    :param offsets: start of each row, followed by N
+    :type offsets: (S + 1,) array-like of int
+    :return: row i holds ``values[offsets[i]:offsets[i + 1]]``
+    :rtype: (S, max row length) ndarray
+    """
+    values = np.asarray(values, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    width = counts.max() if len(counts) else 0
+
+    out = np.full((len(counts), width), np.nan)
+    rows = np.repeat(np.arange(len(counts)), counts)
+    cols = np.arange(offsets[0], offsets[-1]) - np.repeat(offsets[:-1], counts)
+    out[rows, cols] = values[offsets[0] : offsets[-1]]
+    return out
+
+
+def _as_matrix(z, offsets=None):
+    "Return z as a 2D float matrix with one group per row."
+    if offsets is not None:
+        return padded_matrix(z, offsets)
+    if isinstance(z, np.ndarray) and z.ndim == 2:
+        return z.astype(float, copy=False)
+
+    rows = [np.asarray(row, dtype=float).ravel() for row in z]
+    counts = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    values = np.concatenate(rows) if rows else np.empty(0)
+    return padded_matrix(values, offsets)
+
+
+def swath_stats(
+    z,
+    offsets=None,
+    stats=("min", "max", "mean"),
+    percentiles=(25, 75),
+):
+    """Summary statistics of each group of values, ignoring NaN.
+
+    Groups are the rows of a matrix, a list of sequences, or flat values
+    split by offsets. Rows are sorted once, minimum, maximum and all
+    percentiles are read from the sorted rows, and mean and standard
+    deviation are axis-wise sums, so no statistic loops over the groups.
+    Groups without any value give NaN.
+
+    :param z: values of groups
+    :type z: 2D array, list of sequences or (N,) array with offsets
+    :param offsets: start of each group in z, followed by N, defaults to None
+    :type offsets: (S + 1,) array-like of int, optional
+    :param stats: statistics among "min", "max", "mean", "std" and "count",
+        defaults to ("min", "max", "mean")
+    :type stats: sequence of str, optional
+    :param percentiles: percentiles in [0, 100], interpolated linearly as
+        numpy.nanpercentile, defaults to (25, 75)
+    :type percentiles: sequence of float, optional
+    :return: statistics of each group, keyed by name, percentiles keyed as
+        "p25", "p75", ...
+    :rtype: OrderedDict of (S,) ndarray
+    """
+    unknown = set(stats) - {"min", "max", "mean", "std", "count"}
+    if unknown:
+        raise ValueError("Unknown statistics: {}".format(sorted(unknown)))
+
+    mat = _as_matrix(z, offsets)
+    if mat.shape[1] == 0:
+        mat = np.full((len(mat), 1), np.nan)
+    valid = ~np.isnan(mat)
+    count = valid.sum(axis=1)
+    empty = count == 0
+    out = OrderedDict()
+
+    if {"min", "max"} & set(stats) or len(percentiles):
+        # NaN sorts last, valid values of row i fill its first count[i] columns
+        ordered = np.sort(mat, axis=1)
+        rows = np.arange(len(mat))
+        last = np.maximum(count - 1, 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if "mean" in stats or "std" in stats:
+            mean = np.where(valid, mat, 0.0).sum(axis=1) / count
+
+        for name in stats:
+            if name == "min":
+                val = ordered[:, 0]
+            elif name == "max":
+                val = ordered[rows, last]
+            elif name == "mean":
+                val = mean
+            elif name == "std":
+                dev = np.where(valid, mat - mean[:, None], 0.0)
+                val = np.sqrt(np.square(dev).sum(axis=1) / count)
+            else:
+                val = count
+            if name != "count":
+                val = np.where(empty, np.nan, val)
+            out[name] = val
+
+        for q in percentiles:
+            out["p{:g}".format(q)] = _percentile(ordered, count, last, q)
+
+    return out
+
+
+def _percentile(ordered, count, last, q):
+    "Linearly interpolated percentile q of the valid head of each sorted row."
+    if not 0 <= q <= 100:
+        raise ValueError("Percentiles must be in the range [0, 100]")
+    out = np.full(len(ordered), np.nan)
+    keep = count > 0
+    if not keep.any():
+        return out
+
+    index = (count[keep] - 1) * (q / 100.0)
+    below = np.floor(index).astype(np.int64)
+    above = np.minimum(below + 1, last[keep])
+    rows = np.flatnonzero(keep)
+    a, b = ordered[rows, below], ordered[rows, above]
+    t = index - below
+
+    # interpolate from the nearer end, the same as numpy
+    diff = b - a
+    out[keep] = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return out
+
+
+class Station_sketch:
+    """Summary statistics of stations, reduced as transects are sampled.
+
+    Minimum, maximum, mean, standard deviation and count of each station are
+    exact. Quantiles are estimated from a histogram per station with fixed
+    bins over [lo, hi], values beyond the range fall in the end bins. For
+    values within the range they are off by less than one bin width from
+    numpy's linear percentiles. Memory grows with stations and bins only, not
+    with the number of samples, and sketches of the same bins can be merged.
+
+    :param n_stations: number of stations
+    :type n_stations: int
+    :param lo: lower edge of bins
+    :type lo: float
+    :param hi: upper edge of bins
+    :type hi: float
+    :param bins: number of bins, defaults to 256
+    :type bins: int, optional
+    """
+
+    def __init__(self, n_stations, lo, hi, bins=256):
+        self.lo = float(lo)
+        self.hi = float(hi) if hi > lo else float(lo) + 1.0
+        self.bins = int(bins)
+        self.count = np.zeros(n_stations, dtype=np.int64)
+        self.min = np.full(n_stations, np.inf)
+        self.max = np.full(n_stations, -np.inf)
+        self.mean = np.zeros(n_stations)
+        self.m2 = np.zeros(n_stations)
+        self.hist = np.zeros((n_stations, self.bins), dtype=np.int32)
+
+    def __repr__(self):
+        return "{}(stations={}, bins={})".format(
+            self.__class__.__name__, len(self), self.bins
+        )
+
+    def __len__(self):
+        return len(self.count)
+
+    @property
+    def nbytes(self):
+        "Memory used by the arrays in bytes."
+        return sum(
+            arr.nbytes
+            for arr in (self.count, self.min, self.max, self.mean, self.m2, self.hist)
+        )
+
+    def arrays(self):
+        "Return the arrays of the sketch by name, as stored in files."
+        return {
+            "range": np.array([self.lo, self.hi]),
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "m2": self.m2,
+            "hist": self.hist,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        "Return a Station_sketch from arrays returned by arrays()."
+        lo, hi = arrays["range"]
+        hist = arrays["hist"]
+        sketch = cls(hist.shape[0], lo, hi, hist.shape[1])
+        for name in ("count", "min", "max", "mean", "m2", "hist"):
+            getattr(sketch, name)[...] = arrays[name]
+        return sketch
+
+    def update(self, values, offsets, start=0):
+        """Add values of stations, stored flat.
+
+        :param values: values of all stations, concatenated
+        :type values: (N,) array-like
+        :param offsets: start of each station in values, followed by N
+        :type offsets: (S + 1,) array-like of int
+        :param start: index of the first of these stations, defaults to 0
+        :type start: int, optional
+        """
+        values = np.asarray(values, dtype=float)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n = len(offsets) - 1
+        names = ("min", "max", "mean", "std", "count")
+        stat = swath_stats(values, offsets, stats=names, percentiles=())
+
+        flat = values[offsets[0] : offsets[-1]]
+        keep = ~np.isnan(flat)
+        station = np.repeat(np.arange(n), np.diff(offsets))[keep]
+        width = (self.hi - self.lo) / self.bins
+        index = ((flat[keep] - self.lo) / width).astype(np.int64)
+        index = np.clip(index, 0, self.bins - 1)
+        hist = np.bincount(station * self.bins + index, minlength=n * self.bins)
+
+        seen = stat["count"] > 0
+        self._combine(
+            slice(start, start + n),
+            stat["count"],
+            np.where(seen, stat["min"], np.inf),
+            np.where(seen, stat["max"], -np.inf),
+            np.where(seen, stat["mean"], 0.0),
+            np.where(seen, np.square(stat["std"]) * stat["count"], 0.0),
+            hist.reshape(n, self.bins),
+        )
+        return self
+
+    def merge(self, other, start=0):
+        """Add another sketch with the same bins, covering stations from start.
+
+        :param other: sketch to add
+        :type other: Station_sketch
+        :param start: index of the first station of other, defaults to 0
+        :type start: int, optional
+        """
+        if (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("Sketches with different bins cannot be merged")
+        self._combine(
+            slice(start, start + len(other)),
+            other.count,
+            other.min,
+            other.max,
+            other.mean,
+            other.m2,
+            other.hist,
+        )
+        return self
+
+    def _combine(self, rows, count, min_, max_, mean, m2, hist):
+        "Merge partial statistics into rows, with the parallel variance formula."
+        n_a, n_b = self.count[rows], count
+        total = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean[rows]
+            share = np.where(total > 0, n_b / total, 0.0)
+            self.mean[rows] += delta * share
+            self.m2[rows] += m2 + np.square(delta) * n_a * share
+
+        self.count[rows] = total
+        self.min[rows] = np.minimum(self.min[rows], min_)
+        self.max[rows] = np.maximum(self.max[rows], max_)
+        self.hist[rows] += hist
+
+    def quantile(self, q):
+        """Return the estimated percentile q of each station.
+
+        Percentiles interpolate between the two order statistics around the
+        rank, as numpy's linear method does. Each order statistic is placed
+        within the bin holding it, so estimates are off by less than one bin
+        width, and they are clipped to the exact minimum and maximum of the
+        station.
+
+        :param q: percentile in [0, 100]
+        :type q: float
+        :rtype: (S,) ndarray
+        """
+        if not 0 <= q <= 100:
+            raise ValueError("Percentiles must be in the range [0, 100]")
+        out = np.full(len(self), np.nan)
+        keep = self.count > 0
+        if not keep.any():
+            return out
+
+        hist = self.hist[keep]
+        cum = np.cumsum(hist, axis=1)
+        count = self.count[keep]
+        rank = (count - 1) * (q / 100.0)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, count - 1)
+        a = self._order_stat(hist, cum, lower)
+        b = self._order_stat(hist, cum, upper)
+
+        est = a + (b - a) * (rank - lower)
+        out[keep] = np.clip(est, self.min[keep], self.max[keep])
+        return out
+
+    def _order_stat(self, hist, cum, k):
+        "Estimate the k-th smallest value of each row, spread evenly in its bin."
+        index = np.argmax(cum > k[:, None], axis=1)
+        rows = np.arange(len(hist))
+        below = cum[rows, index] - hist[rows, index]
+        frac = (k - below + 0.5) / hist[rows, index]
+
+        width = (self.hi - self.lo) / self.bins
+        return self.lo + (index + frac) * width
+
+    def stats(self, stats=("min", "max", "mean"), percentiles=(25, 75)):
+        """Return statistics of each station, keyed as swath_stats.
+
+        :param stats: statistics among "min", "max", "mean", "std" and
+            "count", defaults to ("min", "max", "mean")
+        :type stats: sequence of str, optional
+        :param percentiles: percentiles to estimate, defaults to (25, 75)
+        :type percentiles: sequence of float, optional
+        :rtype: OrderedDict of (S,) ndarray
+        """
+        unknown = set(stats) - {"min", "max", "mean", "std", "count"}
+        if unknown:
+            raise ValueError("Unknown statistics: {}".format(sorted(unknown)))
+
+        empty = self.count == 0
+        out = OrderedDict()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            exact = {
+                "min": self.min,
+                "max": self.max,
+                "mean": self.mean,
+                "std": np.sqrt(self.m2 / self.count),
+            }
+        for name in stats:
+            if name == "count":
+                out[name] = self.count.copy()
+            else:
+                out[name] = np.where(empty, np.nan, exact[name])
+        for q in percentiles:
+            out["p{:g}".format(q)] = self.quantile(q)
+
+        return out
+
+
+class Value_histogram:
+    """Counts of values in fixed bins, accumulated part by part.
+
+    Values are binned as numpy.histogram does, NaN and values beyond the
+    edges are not counted. Parts binned separately, e.g. by parallel
+    workers, are merged by adding their counts.
+
+    :param edges: increasing bin edges
+    :type edges: (B + 1,) array-like
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        widths = np.diff(self.edges)
+        self._uniform = np.allclose(widths, widths[0])
+
+    def __repr__(self):
+        return "{}(bins={}, count={})".format(
+            self.__class__.__name__, len(self.counts), self.counts.sum()
+        )
+
+    @classmethod
+    def from_range(cls, lo, hi, bins=50):
+        "Return an empty histogram of bins equal bins over [lo, hi]."
+        if not hi > lo:
+            lo, hi = lo - 0.5, hi + 0.5
+        return cls(np.linspace(lo, hi, bins + 1))
+
+    @classmethod
+    def from_values(cls, values, bins=50):
+        """Return the histogram of values.
+
+        :param values: values, NaN ignored
+        :type values: array-like
+        :param bins: number of bins over the range of values, or bin edges,
+            defaults to 50
+        :type bins: int or array-like, optional
+        """
+        values = np.ravel(np.asarray(values, dtype=float))
+        values = values[~np.isnan(values)]
+        histogram = cls(np.histogram_bin_edges(values, bins))
+        return histogram.update(values)
+
+    @property
+    def density(self):
+        "Counts normalized to a probability density."
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.counts / (self.counts.sum() * np.diff(self.edges))
+
+    def update(self, values):
+        """Add values to the counts.
+
+        :param values: values, NaN ignored
+        :type values: array-like
+        """
+        values = np.ravel(np.asarray(values, dtype=float))
+        lo, hi = self.edges[0], self.edges[-1]
+        values = values[(values >= lo) & (values <= hi)]
+        bins = len(self.counts)
+
+        if self._uniform:
+            # compute bins directly, then fix the ones rounding moved
+            index = ((values - lo) / (hi - lo) * bins).astype(np.int64)
+            index = np.minimum(index, bins - 1)
+            index -= values < self.edges[index]
+            index += (values >= self.edges[index + 1]) & (index != bins - 1)
+        else:
+            index = np.searchsorted(self.edges, values, side="right") - 1
+            index = np.minimum(index, bins - 1)
+
+        self.counts += np.bincount(index, minlength=bins)
+        return self
+
+    def merge(self, other):
+        """Add the counts of another histogram with the same edges.
+
+        :param other: histogram to add
+        :type other: Value_histogram
+        """
+        if not np.array_equal(other.edges, self.edges):
+            raise ValueError("Histograms with different bins cannot be merged")
+        self.counts += other.counts
+        return self
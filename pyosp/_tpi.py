@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
+from ._raster import Tile_grid
 
 
 class Tpi:
-    def __init__(self, point_coord, raster, radius):
+    def __init__(self, point_coord, raster, radius, sampler=None):
         """Calculate the TPI value of the point
 
         :param point_coord: point coodinates
@@ -13,9 +14,12 @@ class Tpi:
         :type raster: GDAL dataset
         :param radius: radius of TPI window
         :type radius: float
+        :param sampler: read windows through a sampler, defaults to None
+        :type sampler: Raster_sampler, optional
         """
         self.p = point_coord
         self.raster = raster
+        self.sampler = sampler
         self.cols = raster.RasterXSize
         self.rows = raster.RasterYSize
         self.geoTransform = raster.GetGeoTransform()
@@ -34,9 +38,7 @@ class Tpi:
         xmax = min(self.cols, px + self.radiusInPixel + 1)
         ymin = max(0, py - self.radiusInPixel)
         ymax = min(self.rows, py + self.radiusInPixel + 1)
-        arr = self.raster.ReadAsArray(
-            xoff=xmin, yoff=ymin, xsize=xmax - xmin, ysize=ymax - ymin
-        ).astype(float)
+        arr = self.read(xmin, ymin, xmax - xmin, ymax - ymin).astype(float)
         # Treat small values as no data
         arr_min = np.min(arr)
         arr[arr == arr_min] = np.nan
@@ -45,8 +47,180 @@ class Tpi:
 
     def point_value(self):
         py, px = self.point_position()
-        return self.raster.ReadAsArray(xoff=px, yoff=py, xsize=1, ysize=1)[0]
+        return self.read(px, py, 1, 1)[0]
+
+    def read(self, xoff, yoff, xsize, ysize):
+        "Read a window of the raster"
+        if self.sampler is not None:
+            return self.sampler.read(xoff, yoff, xsize, ysize)
+        return self.raster.ReadAsArray(
+            xoff=xoff, yoff=yoff, xsize=xsize, ysize=ysize
+        )
 
     @property
     def value(self):
         return self.point_value() - self.avg_window()
+
+
+def _box_sum(a, size):
+    "Sum of every size x size box of a, from its integral image."
+    integral = np.zeros((a.shape[0] + 1, a.shape[1] + 1), dtype=a.dtype)
+    integral[1:, 1:] = a.cumsum(axis=0).cumsum(axis=1)
+    return (
+        integral[size:, size:]
+        - integral[:-size, size:]
+        - integral[size:, :-size]
+        + integral[:-size, :-size]
+    )
+
+
+def _prefix_min_count(values, counts):
+    "Running minimum along the last axis and the counts of cells equal to it."
+    run_min = np.minimum.accumulate(values, axis=-1)
+    equal = np.where(values == run_min, counts, 0)
+    cum = equal.cumsum(axis=-1)
+
+    # counts restart where the running minimum drops
+    drop = np.ones(values.shape, dtype=bool)
+    drop[..., 1:] = run_min[..., 1:] < run_min[..., :-1]
+    start = np.where(drop, np.arange(values.shape[-1]), 0)
+    start = np.maximum.accumulate(start, axis=-1)
+    before = np.take_along_axis(cum - equal, start, axis=-1)
+
+    return run_min, cum - before
+
+
+def _sliding_min_count(values, counts, size):
+    """Minimum and number of minima of every window of size along the last axis.
+
+    Van Herk/Gil-Werman scheme: prefix and suffix minima within blocks of
+    size, so the cost does not depend on the window size.
+    """
+    n = values.shape[-1]
+    nblocks = -(-n // size)
+    pad = [(0, 0)] * (values.ndim - 1) + [(0, nblocks * size - n)]
+    values = np.pad(values, pad, constant_values=np.inf)
+    counts = np.pad(counts, pad, constant_values=0)
+
+    shape = values.shape[:-1] + (nblocks, size)
+    g_min, g_count = _prefix_min_count(values.reshape(shape), counts.reshape(shape))
+    h_min, h_count = _prefix_min_count(
+        values.reshape(shape)[..., ::-1], counts.reshape(shape)[..., ::-1]
+    )
+    g_min, g_count = g_min.reshape(values.shape), g_count.reshape(values.shape)
+    h_min = h_min[..., ::-1].reshape(values.shape)
+    h_count = h_count[..., ::-1].reshape(values.shape)
+
+    # window [i, i + size) = suffix of block of i + prefix of block of i + size - 1
+    nout = n - size + 1
+    h_min, h_count = h_min[..., :nout], h_count[..., :nout]
+    g_min, g_count = g_min[..., size - 1 : n], g_count[..., size - 1 : n]
+    out_min = np.minimum(h_min, g_min)
+    out_count = np.where(h_min == out_min, h_count, 0) + np.where(
+        g_min == out_min, g_count, 0
+    )
+
+    # windows aligned with a block are covered by the suffix alone
+    aligned = np.arange(nout) % size == 0
+    out_count = np.where(aligned, h_count, out_count)
+
+    return out_min, out_count
+
+
+class Tpi_grid(Tile_grid):
+    """TPI of raster cells from integral images, computed tile by tile and cached.
+
+    Sums and valid counts of every window come from integral images, and the
+    window minimum (which Tpi treats as no data) from a sliding minimum, so
+    each cell costs the same whatever the radius. Values are equal to Tpi,
+    which excludes the central point and the cells equal to the window minimum.
+
+    :param sampler: sampler of the GeoRaster
+    :type sampler: Raster_sampler
+    :param radius: radius of TPI window
+    :type radius: float
+    :param tile_size: edge of computed tiles in pixels, defaults to twice the
+        radius, between 256 and 2048
+    :type tile_size: int, optional
+    :param max_bytes: memory budget of cached tiles in bytes, defaults to 256 MB
+    :type max_bytes: int, optional
+    """
+
+    phase = "tpi"
+
+    def __init__(self, sampler, radius, tile_size=None, max_bytes=256 * 2 ** 20):
+        self.sampler = sampler
+        self.radius = radius
+        self.radiusInPixel = int(radius / sampler.geoTransform[1])
+        if tile_size is None:
+            tile_size = min(max(2 * self.radiusInPixel, 256), 2048)
+        super(Tpi_grid, self).__init__(
+            sampler.cols,
+            sampler.rows,
+            tile_size,
+            tile_size,
+            max_bytes,
+            sampler.run_stats,
+        )
+
+    def compute(self, xoff, yoff, xsize, ysize):
+        "Return the TPI of a window."
+        r = self.radiusInPixel
+        size = 2 * r + 1
+
+        # read the window with a halo of radius, windows are clipped to raster
+        xmin, ymin = max(xoff - r, 0), max(yoff - r, 0)
+        xmax = min(xoff + xsize + r, self.cols)
+        ymax = min(yoff + ysize + r, self.rows)
+        arr = self.sampler.read(xmin, ymin, xmax - xmin, ymax - ymin)
+        pad = (
+            (ymin - yoff + r, yoff + ysize + r - ymax),
+            (xmin - xoff + r, xoff + xsize + r - xmax),
+        )
+
+        nan = np.isnan(arr)
+        # very small values are no data, keep them out of the sums
+        nodata = ~nan & (arr <= -1e20)
+        valid = ~nan & ~nodata
+        offset = arr[valid].mean() if valid.any() else 0.0
+        shifted = np.where(valid, arr - offset, 0.0)
+
+        sum_valid = _box_sum(np.pad(shifted, pad), size)
+        n_valid = _box_sum(np.pad(valid.astype(np.int64), pad), size)
+        n_nodata = _box_sum(np.pad(nodata.astype(np.int64), pad), size)
+        n_nan = _box_sum(np.pad(nan.astype(np.int64), pad), size)
+
+        # window minimum and how many cells are equal to it
+        low = np.pad(np.where(nan, np.inf, arr), pad, constant_values=np.inf)
+        ones = np.pad((~nan).astype(np.int64), pad)
+        low, n_low = _sliding_min_count(low, ones, size)
+        low, n_low = _sliding_min_count(
+            np.swapaxes(low, 0, 1), np.swapaxes(n_low, 0, 1), size
+        )
+        low, n_low = np.swapaxes(low, 0, 1), np.swapaxes(n_low, 0, 1)
+
+        # Tpi skips the minimum if the window has NaN, as np.min returns NaN
+        n_low = np.where(n_nan > 0, 0, n_low)
+        sum_kept = np.where(
+            (n_nodata > 0) | (n_low == 0), sum_valid, sum_valid - (low - offset) * n_low
+        )
+        n_kept = n_valid + n_nodata - n_low
+
+        centre = arr[yoff - ymin :, xoff - xmin :][:ysize, :xsize] - offset
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return centre - (sum_kept - centre) / (n_kept - 1)
+
+    def values(self, points):
+        """Return TPI values of points, NaN outside of the raster.
+
+        :param points: point coordinates
+        :type points: (N, 2) array-like
+        """
+        py, px, inside = self.sampler.point_position(points)
+        out = np.full(len(py), np.nan)
+        out[inside] = self.take(py[inside], px[inside])
+        return out
+
+    def value(self, point):
+        "Return TPI value of a single point."
+        return self.values(point)[0]
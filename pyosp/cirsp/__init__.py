@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 
-__all__ = ["Base_cir", "Orig_cir", "Elev_cir", "Slope_cir", "Tpi_cir"]
+__all__ = [
+    "Base_cir",
+    "Orig_cir",
+    "Elev_cir",
+    "Slope_cir",
+    "Tpi_cir",
+    "Threshold_error",
+]
 
-from .base_cir import Base_cir
+from .base_cir import Base_cir, Threshold_error
 from .orig_cir import Orig_cir
 from .elev_cir import Elev_cir
 from .slope_cir import Slope_cir
@@ -1,18 +1,44 @@
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+from functools import partial
+import warnings
 from osgeo import gdal
-from shapely.geometry import Polygon, LineString, MultiLineString
+from shapely.geometry import Polygon, LineString, MultiLineString, Point
+from shapely import wkb
 import numpy as np
-import matplotlib.pyplot as plt
-from .._elevation import Point_elevation
-from ..util import read_shape
+from .._elevation import Raster_sampler
+from .._raster import Tile_cache
+from .._slope import Slope_grid
+from .._tpi import Tpi_grid
+from .._instrument import Run_stats
+from .._stats import swath_stats, Value_histogram
+from .._cache import Result_cache
+from .._lazy import Lazy_module
+from .._parallel import parallel_chunks
+from ..util import (
+    read_shape,
+    read_features,
+    progressBar,
+    write_npz,
+    read_npz,
+    subclass_named,
+)
+
+
+# plotting module, imported by the first plot
+plt = Lazy_module("matplotlib.pyplot")
+
+
+class Threshold_error(Exception):
+    "Raised when a radial line has no point meeting the threshold."
 
 
 class Base_cir:
     """Abstract class for circular swath profile.
 
-    :param center: path to center shapefile
-    :type center: str
+    :param center: path to center shapefile, or the center
+    :type center: str or shapely Point
     :param raster: path to GeoRaster
     :type raster: str
     :param radius: radius of swath area
@@ -25,8 +51,28 @@ class Base_cir:
     :type ng_stepsize: int, optional
     :param radial_stepsize: radial step-size, defaults to None
     :type radial_stepsize: int, optional
+    :param cache_size: memory budget in bytes of cached raster blocks, defaults to None
+        that reads rasters up to 256 MB into memory, and larger ones through a
+        cache of that budget
+    :type cache_size: int, optional
+    :param memmap: map the raster read-only from a .npy sidecar shared by
+        processes, path to the sidecar or True to put it next to the raster,
+        defaults to None
+    :type memmap: str or bool, optional
+    :param progress: called with the current and total number of steps, False
+        to disable, defaults to util.progressBar
+    :type progress: callable or bool, optional
+    :param run_stats: record phase times and raster reads into it, defaults to
+        a new Run_stats
+    :type run_stats: Run_stats, optional
+    :param cache_dir: directory keeping radial lines and swath data across
+        runs, or a Result_cache, defaults to None
+    :type cache_dir: str or Result_cache, optional
     """
 
+    # parameters the radial lines depend on, keys of the result cache
+    cache_params = ("radius", "ng_start", "ng_end", "ng_stepsize", "radial_stepsize")
+
     def __init__(
         self,
         center,
@@ -36,13 +82,31 @@ class Base_cir:
         ng_end=None,
         ng_stepsize=1,
         radial_stepsize=None,
+        cache_size=None,
+        memmap=None,
+        progress=None,
+        run_stats=None,
+        cache_dir=None,
     ):
         # Empty swath profile is line or raster is None
         if center is None or raster is None:
             return
         else:
-            self.center = read_shape(center)
-            self.raster = gdal.Open(raster)
+            if isinstance(center, str):
+                center = read_shape(center)
+            self.center = center
+            self.raster_path = raster
+
+        self.progress = progressBar if progress is None else progress
+        self.run_stats = Run_stats() if run_stats is None else run_stats
+        if cache_dir is None or isinstance(cache_dir, Result_cache):
+            self.result_cache = cache_dir
+        else:
+            self.result_cache = Result_cache(cache_dir)
+
+        self.cache_size = cache_size
+        self.memmap = memmap
+        self._open_raster()
 
         self.radius = radius
 
@@ -72,14 +136,238 @@ class Base_cir:
         else:
             self.radial_stepsize = radial_stepsize
 
-        # swath data
+        # swath data, radial lines are built and sampled on first use
         self.distance = np.arange(0.0, self.radius + 1e-10, self.radial_stepsize)
-        self.lines = self._radial_lines()
-        if self.lines == None:
-            return
+        self._lines = None
+        self._dat = None
+
+    def __getstate__(self):
+        "Drop the GDAL handle and raster caches, opened again when unpickled."
+        state = self.__dict__.copy()
+        for key in [
+            "_lines",
+            "_dat",
+            "raster",
+            "sampler",
+            "_grids",
+            "progress",
+            "run_stats",
+        ]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lines = None
+        self._dat = None
+        self.progress = False
+        self.run_stats = Run_stats()
+        if "raster_path" in state:
+            self._open_raster()
+
+    def _open_raster(self):
+        "Open the raster and its sampler."
+        self.raster = gdal.Open(self.raster_path)
+
+        # Read raster blocks through a LRU cache if a budget is given
+        if self.cache_size is None:
+            self.sampler = Raster_sampler(
+                self.raster, memmap=self.memmap, run_stats=self.run_stats
+            )
         else:
-            self.dat_steps = max(len(x) for x in self.lines)
-            self.dat = self.swath_data()
+            cache = Tile_cache(self.raster, self.cache_size, run_stats=self.run_stats)
+            self.sampler = Raster_sampler(
+                self.raster, cache=cache, run_stats=self.run_stats
+            )
+        # slope and TPI grids, one dict shared by copies of batch
+        self._grids = {}
+
+    def _with_center(self, center):
+        "Return a swath profile around another center, sharing raster and caches."
+        profile = object.__new__(self.__class__)
+        profile.__dict__.update(self.__dict__)
+        profile.__dict__.pop("_batch_xy", None)
+        profile.center = center
+        profile.progress = False
+        profile._lines = None
+        profile._dat = None
+        return profile
+
+    @classmethod
+    def batch(
+        cls,
+        centers,
+        raster,
+        radius,
+        stats=("min", "max", "mean"),
+        percentiles=(25, 75),
+        n_jobs=None,
+        executor=None,
+        **kwargs
+    ):
+        """Summary statistics of swath profiles around many centers, in one table.
+
+        The raster is opened once and shared by all centers. Centers are
+        visited along a Z-order curve, so consecutive centers read the same
+        raster blocks, and with n_jobs or executor each process handles a
+        compact group of them. For a large raster, pass cache_size or memmap
+        so processes do not each read it whole.
+
+        Statistics are taken at each distance from the center, as swath_stat.
+        Centers where the thresholds cannot be met, or out of the raster,
+        get NaN and are marked not valid.
+
+        :param centers: path to shapefile of points or multi-points, or
+            coordinates of centers
+        :type centers: str or (C, 2) array-like
+        :param raster: path to GeoRaster
+        :type raster: str
+        :param radius: radius of swath areas
+        :type radius: float
+        :param stats: statistics among "min", "max", "mean", "std" and
+            "count", defaults to ("min", "max", "mean")
+        :type stats: sequence of str, optional
+        :param percentiles: percentiles to compute, defaults to (25, 75)
+        :type percentiles: sequence of float, optional
+        :param n_jobs: number of processes, defaults to None
+        :type n_jobs: int, optional
+        :param executor: executor running the groups in processes instead of a
+            new process pool, threads are rejected, defaults to None
+        :type executor: concurrent.futures.Executor, optional
+        :param **kwargs: thresholds of the terrain type and other arguments
+            of the class
+        :type **kwargs: arbitrary, optional
+        :return: columns "fid", "x", "y" and "valid" of length C, then each
+            statistic as a (C, D) array, column j at distance
+            ``j * radial_stepsize``, in the order of centers
+        :rtype: OrderedDict of ndarray
+        """
+        fid, xy = _read_centers(centers)
+        if not len(xy):
+            raise ValueError("No centers given")
+
+        template = cls(Point(xy[0]), raster, radius, **kwargs)
+        order = _spatial_order(xy)
+        template._batch_xy = xy[order]
+        num = len(xy)
+
+        if n_jobs in (None, 1) and executor is None:
+            chunks = [(0, template._batch_stats(0, num, stats, percentiles))]
+        else:
+            worker = partial(_batch_chunk, stats=stats, percentiles=percentiles)
+            chunks = parallel_chunks(template, worker, num, n_jobs, executor)
+
+        table = OrderedDict(
+            [("fid", fid), ("x", xy[:, 0]), ("y", xy[:, 1]), ("valid", None)]
+        )
+        valid = np.zeros(num, dtype=bool)
+        for start, (columns, chunk_valid) in chunks:
+            rows = order[start : start + len(chunk_valid)]
+            valid[rows] = chunk_valid
+            for name, values in columns.items():
+                if name not in table:
+                    table[name] = np.full((num, values.shape[1]), np.nan)
+                table[name][rows] = values
+        table["valid"] = valid
+        return table
+
+    def _batch_stats(self, start, stop, stats, percentiles):
+        "Statistics of centers start to stop of a batch, one row per center."
+        size = len(self.distance)
+        names = list(stats) + ["p{:g}".format(q) for q in percentiles]
+        columns = OrderedDict(
+            (name, np.full((stop - start, size), np.nan)) for name in names
+        )
+        valid = np.zeros(stop - start, dtype=bool)
+
+        for i, (x, y) in enumerate(self._batch_xy[start:stop]):
+            stat = self._center_stat(x, y, stats, percentiles)
+            self._progress(start + i + 1, len(self._batch_xy))
+            if stat is None:
+                continue
+            for name, values in stat.items():
+                columns[name][i, : len(values)] = values
+            valid[i] = True
+
+        return columns, valid
+
+    def _center_stat(self, x, y, stats, percentiles):
+        "Statistics around center (x, y), None if off the raster or no line fits."
+        inside = (self.rasterXmin <= x <= self.rasterXmax) and (
+            self.rasterYmin <= y <= self.rasterYmax
+        )
+        if not inside or not self.sampler.value((x, y)) > -1e20:
+            return None
+
+        try:
+            return self._with_center(Point(x, y)).swath_stat(stats, percentiles)
+        except Threshold_error:
+            return None
+
+    @property
+    def lines(self):
+        "Radial lines as lists of points, built on first use."
+        if self._lines is None and not self._load_cached():
+            with self.run_stats.phase("transects"):
+                self._lines = self._radial_lines()
+            if self.result_cache is not None and self._lines is not None:
+                self._save_cached()
+        return self._lines
+
+    @property
+    def dat_steps(self):
+        "Number of points of the longest radial line."
+        return max(len(x) for x in self.lines)
+
+    @property
+    def dat(self):
+        "Swath data of radial lines padded to dat_steps, sampled on first use."
+        if self._dat is None and self.lines is not None:
+            with self.run_stats.phase("sampling"):
+                self._dat = self.swath_data()
+        return self._dat
+
+    def _cache_key(self):
+        "Key of radial lines and swath data in the result cache."
+        params = {name: getattr(self, name) for name in self.cache_params}
+        return self.result_cache.key(
+            self.raster_path, self.center, self.__class__.__name__, params
+        )
+
+    def _load_cached(self):
+        "Load radial lines and swath data from the result cache if there."
+        if self.result_cache is None:
+            return False
+        with self.run_stats.phase("cache"):
+            arrays = self.result_cache.load(self._cache_key())
+        if arrays is None:
+            return False
+
+        self._set_line_arrays(arrays)
+        return True
+
+    def _save_cached(self):
+        "Store radial lines and swath data, sampled now, in the result cache."
+        arrays = self._line_arrays()
+        with self.run_stats.phase("cache"):
+            self.result_cache.save(self._cache_key(), arrays)
+
+    def _line_arrays(self):
+        "Radial lines as flat points and offsets, and swath data as a matrix."
+        counts = [len(line) for line in self.lines]
+        xy = [point for line in self.lines for point in line]
+        return {
+            "xy": np.asarray(xy, dtype=float).reshape(-1, 2),
+            "offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            "dat": np.asarray(self.dat, dtype=float).reshape(len(counts), -1),
+        }
+
+    def _set_line_arrays(self, arrays):
+        "Set radial lines and swath data from arrays of _line_arrays."
+        points = arrays["xy"].tolist()
+        offsets = arrays["offsets"]
+        self._lines = [points[lo:hi] for lo, hi in zip(offsets[:-1], offsets[1:])]
+        self._dat = list(arrays["dat"])
 
     def _radial_lines(self):
         """
@@ -87,6 +375,92 @@ class Base_cir:
         """
         pass
 
+    def _ray_points(self):
+        """Return points of all angles by all radii, sampled in one pass.
+
+        :return: points, their raster values, and the number of points of each
+            ray up to the first one off the raster or on no data
+        :rtype: (A, R, 2) array, (A, R) array and (A,) array of int
+        """
+        sector = np.radians(
+            np.arange(self.ng_start, self.ng_end + 0.00001, self.ng_stepsize)
+        )
+        radial_line = np.arange(0.0, self.radius + 0.00001, self.radial_stepsize)
+        xy = np.empty((len(sector), len(radial_line), 2))
+        xy[..., 0] = self.center.x + radial_line * np.cos(sector)[:, None]
+        xy[..., 1] = self.center.y + radial_line * np.sin(sector)[:, None]
+
+        elev = self.sampler.values(xy.reshape(-1, 2)).reshape(xy.shape[:-1])
+        keep = (self.rasterXmin <= xy[..., 0]) & (xy[..., 0] <= self.rasterXmax)
+        keep &= (self.rasterYmin <= xy[..., 1]) & (xy[..., 1] <= self.rasterYmax)
+        keep &= elev > -1e20
+        # a closing False column counts all points of rays kept to the end
+        keep = np.hstack([keep, np.zeros((len(keep), 1), dtype=bool)])
+        return xy, elev, keep.argmin(axis=1)
+
+    def _threshold_rays(self, values, minimum, name):
+        """Cut rays past the rim top at the first point below minimum.
+
+        The rim top is the highest point of each ray, rays are kept whole if
+        it is their last point or no value after it is below minimum.
+
+        :param values: return values of an (N, 2) array of points, None for
+            the raster values
+        :type values: callable
+        :param minimum: minimal threshold
+        :type minimum: float
+        :param name: name of the threshold in the error message
+        :type name: str
+        """
+        xy, elev, counts = self._ray_points()
+        if not counts.all():
+            raise ValueError("center is out of the raster or on no data")
+
+        if values is None:
+            crit = elev
+        else:
+            crit = values(xy.reshape(-1, 2)).reshape(elev.shape)
+        position = np.arange(elev.shape[1])
+        kept = position < counts[:, None]
+        top = np.where(kept, elev, -np.inf).argmax(axis=1)
+        after = kept & (position >= top[:, None])
+        below = after & (crit < minimum)
+
+        at_end = top == counts - 1
+        if (~at_end & (below == after).all(axis=1)).any():
+            raise Threshold_error(
+                "allowed minimum {} is too big or radius is too small".format(name)
+            )
+        if at_end.any():
+            warnings.warn("Radius is small, not reach the rim top.")
+
+        cut = np.where(below.any(axis=1) & ~at_end, below.argmax(axis=1), counts)
+        return self._ray_lines(xy, cut)
+
+    def _ray_lines(self, xy, counts):
+        "Radial lines of the first counts points of each ray, as lists of points."
+        self._progress(len(counts) - 1, len(counts) - 1)
+        return [ray[:n].tolist() for ray, n in zip(xy, counts)]
+
+    def _progress(self, current, total):
+        "Report progress of the radial lines building."
+        if self.progress:
+            self.progress(current, total)
+
+    @property
+    def slope_grid(self):
+        "Slope of the raster, calculated tile by tile on first use."
+        if "slope" not in self._grids:
+            cell_size = self.sampler.geoTransform[1]
+            self._grids["slope"] = Slope_grid(self.sampler, cell_size)
+        return self._grids["slope"]
+
+    def tpi_grid(self, radius):
+        "TPI of the raster with the window radius, calculated tile by tile."
+        if ("tpi", radius) not in self._grids:
+            self._grids["tpi", radius] = Tpi_grid(self.sampler, radius)
+        return self._grids["tpi", radius]
+
     def out_polygon(self):
         "Return a shapely polygon object"
         try:
@@ -133,17 +507,87 @@ class Base_cir:
         poly = Polygon(l_points + r_points[::-1])
         return poly
 
+    def to_npz(self, out_file):
+        """Write the swath profile to an uncompressed .npz file, one array per column.
+
+        Written arrays are the radial distances, the points and offsets of
+        radial lines, the swath data padded to dat_steps, and summary
+        statistics at each distance prefixed by "stat_".
+
+        :param out_file: file path to restore the swath profile
+        :type out_file: str
+        """
+        arrays = self._line_arrays()
+        arrays["distance"] = self.distance
+        arrays["center_wkb"] = np.frombuffer(self.center.wkb, dtype=np.uint8)
+        stat = self.swath_stat(
+            stats=("min", "max", "mean", "std", "count"), percentiles=(25, 50, 75)
+        )
+        for name, arr in stat.items():
+            arrays["stat_" + name] = arr
+
+        meta = {
+            "class": self.__class__.__name__,
+            "raster_path": self.raster_path,
+            "raster_bounds": [
+                self.rasterXmin,
+                self.rasterXmax,
+                self.rasterYmin,
+                self.rasterYmax,
+            ],
+            "params": {name: getattr(self, name) for name in self.cache_params},
+        }
+        write_npz(arrays, meta, out_file)
+
+    @classmethod
+    def from_file(cls, in_file):
+        """Rebuild a swath profile written by to_npz, without opening the raster.
+
+        Data, statistics, plots and outputs of the swath profile are available,
+        methods sampling the raster again are not.
+
+        :param in_file: file path of the swath profile
+        :type in_file: str
+        :return: swath profile of the class it was written from
+        """
+        arrays, meta = read_npz(in_file)
+        profile = object.__new__(subclass_named(cls, meta["class"]))
+
+        xmin, xmax, ymin, ymax = meta["raster_bounds"]
+        profile.__dict__.update(
+            center=wkb.loads(arrays["center_wkb"].tobytes()),
+            raster_path=meta["raster_path"],
+            raster=None,
+            sampler=None,
+            progress=False,
+            run_stats=Run_stats(),
+            result_cache=None,
+            rasterXmin=xmin,
+            rasterXmax=xmax,
+            rasterYmin=ymin,
+            rasterYmax=ymax,
+            distance=arrays["distance"],
+            _grids={},
+        )
+        profile.__dict__.update(meta["params"])
+        profile._set_line_arrays(arrays)
+        return profile
+
     def swath_data(self):
         "Return a list of elevation data along each profileline"
-        lines_dat = []
-        for line in self.lines:
-            points_temp = []
-            for point in line:
-                rasterVal = Point_elevation(point, self.raster).value
-                points_temp.append(rasterVal)
+        if not self.lines:
+            return []
+
+        # sample all points of all profilelines in one pass
+        points = [point for line in self.lines for point in line]
+        values = self.sampler.values(points) if points else np.empty(0)
+        ends = np.cumsum([len(line) for line in self.lines])
+        dat_steps = self.dat_steps
 
+        lines_dat = []
+        for line_temp in np.split(values, ends[:-1]):
             line_temp = np.append(
-                points_temp, np.repeat(np.nan, self.dat_steps - len(points_temp))
+                line_temp, np.repeat(np.nan, dat_steps - len(line_temp))
             )
             lines_dat.append(line_temp)
 
@@ -151,13 +595,62 @@ class Base_cir:
 
     def profile_stat(self):
         "Return a list of summary statistics along each profileline"
-        min_z = [np.nanmin(x) for x in list(zip(*self.dat))]
-        max_z = [np.nanmax(x) for x in list(zip(*self.dat))]
-        mean_z = [np.nanmean(x) for x in list(zip(*self.dat))]
-        q1 = [np.nanpercentile(x, q=25) for x in list(zip(*self.dat))]
-        q3 = [np.nanpercentile(x, q=75) for x in list(zip(*self.dat))]
+        stat = self.swath_stat()
+        return [list(stat[name]) for name in ("min", "max", "mean", "p25", "p75")]
+
+    def swath_stat(self, stats=("min", "max", "mean"), percentiles=(25, 75)):
+        """Return summary statistics at each distance from the center, computed
+        in one pass.
+
+        :param stats: statistics among "min", "max", "mean", "std" and
+            "count", defaults to ("min", "max", "mean")
+        :type stats: sequence of str, optional
+        :param percentiles: percentiles to compute, defaults to (25, 75)
+        :type percentiles: sequence of float, optional
+        :return: statistics keyed by name, percentiles keyed as "p25", ...
+        :rtype: OrderedDict of ndarray
+        """
+        with self.run_stats.phase("statistics"):
+            # profilelines are padded to dat_steps, columns are distances
+            z = np.asarray(self.dat, dtype=float).reshape(-1, self.dat_steps)
+            return swath_stats(z.T, stats=stats, percentiles=percentiles)
+
+    def post_filter(self, ranges):
+        """Post-processing swath data according to several criteria at once.
+
+        Each attribute is evaluated for all points of the radial lines in one
+        call, and a point is kept only if all of them are in range.
+
+        :param ranges: minimal and maximal thresholds of each attribute, keyed
+            by "elev", "slope" or ("tpi", radius)
+        :type ranges: dict
+        :return: a list contain radial distance, processed elevation data padded
+            to dat_steps, and the mask of kept points in the same layout
+        :rtype: list
+        """
+        counts = np.array([len(line) for line in self.lines])
+        dat = np.asarray(self.dat, dtype=float).reshape(len(counts), -1)
+        # points of radial line i fill the first counts[i] columns of dat
+        filled = np.arange(dat.shape[1]) < counts[:, None]
+        xy = np.asarray([p for line in self.lines for p in line], dtype=float)
+        xy = xy.reshape(-1, 2)
+
+        keep = np.ones(len(xy), dtype=bool)
+        for attribute, (min_val, max_val) in ranges.items():
+            if attribute == "elev":
+                point_val = dat[filled]
+            elif attribute == "slope":
+                point_val = self.slope_grid.values(xy)
+            elif isinstance(attribute, tuple) and attribute[0] == "tpi":
+                point_val = self.tpi_grid(attribute[1]).values(xy)
+            else:
+                raise ValueError("Unknown attribute: {!r}".format(attribute))
+            keep &= (min_val <= point_val) & (point_val <= max_val)
 
-        return [min_z, max_z, mean_z, q1, q3]
+        mask = np.zeros(dat.shape, dtype=bool)
+        mask[filled] = keep
+        values = np.where(mask, dat, np.nan)
+        return [self.distance[: dat.shape[1]], list(values), list(mask)]
 
     def profile_plot(self, ax=None, color="navy", p_coords=None, **kwargs):
         d = np.linspace(
@@ -177,13 +670,11 @@ class Base_cir:
         )
 
         if p_coords is not None:
-            dist_array = np.empty(0)
-            elev_array = np.empty(0)
-            for p in p_coords:
-                dist = np.linalg.norm(np.array(p) - np.array(self.center.coords))
-                elev = Point_elevation(p, self.raster).value
-                dist_array = np.append(dist_array, dist)
-                elev_array = np.append(elev_array, elev)
+            p_coords = np.asarray(p_coords, dtype=float).reshape(-1, 2)
+            dist_array = np.linalg.norm(
+                p_coords - np.array(self.center.coords), axis=1
+            )
+            elev_array = self.sampler.values(p_coords)
 
             ax.scatter(dist_array, elev_array, **kwargs)
 
@@ -244,12 +735,12 @@ class Base_cir:
 
     def hist(self, bins=50, ax=None):
         "Return a histogram plot"
-        dat = np.hstack(self.dat)
+        histogram = Value_histogram.from_values(self.dat, bins)
 
         if ax is None:
             fig, ax = plt.subplots()
 
-        ax.hist(dat, bins=bins, histtype="stepfilled", alpha=1, density=True)
+        _plot_counts(ax, histogram)
         ax.set_xlabel("Elevation")
         ax.set_ylabel("PDF")
         ax.grid()
@@ -269,14 +760,64 @@ class Base_cir:
 
         sector = np.arange(self.ng_start, self.ng_end + 1e-10, self.ng_stepsize)
         ng_ind = np.abs(sector - angle).argmin()
-        dat = self.dat[ng_ind]
+        histogram = Value_histogram.from_values(self.dat[ng_ind], bins)
 
         if ax is None:
             fig, ax = plt.subplots()
 
-        ax.hist(dat, bins=bins, histtype="stepfilled", alpha=1, density=True)
+        _plot_counts(ax, histogram)
         ax.set_xlabel("Elevation")
         ax.set_ylabel("PDF")
         ax.grid()
         plt.tight_layout()
         return ax
+
+
+def _plot_counts(ax, histogram):
+    "Draw a Value_histogram from its counts, each bin weighted by its count."
+    ax.hist(
+        histogram.edges[:-1],
+        bins=histogram.edges,
+        weights=histogram.counts,
+        histtype="stepfilled",
+        alpha=1,
+        density=True,
+    )
+
+
+def _read_centers(centers):
+    "Return feature IDs and coordinates of centers from a shapefile or array."
+    if not isinstance(centers, str):
+        xy = np.asarray(centers, dtype=float).reshape(-1, 2)
+        return np.arange(len(xy)), xy
+
+    fid, xy = [], []
+    for feature_id, _, geom in read_features(centers):
+        # every point of a multi-point feature is a center of its own
+        for point in getattr(geom, "geoms", [geom]):
+            fid.append(feature_id)
+            xy.append(point.coords[0][:2])
+    return np.asarray(fid, dtype=np.int64), np.asarray(xy, dtype=float).reshape(-1, 2)
+
+
+def _spatial_order(xy, bits=16):
+    "Return the order of points along a Z-order curve over their bounding box."
+    xy = np.asarray(xy, dtype=float)
+    lo = xy.min(axis=0)
+    span = np.ptp(xy, axis=0)
+    span[span == 0] = 1.0
+    cells = ((xy - lo) / span * (2 ** bits - 1)).astype(np.uint64)
+
+    # interleave the bits of column and row numbers
+    code = np.zeros(len(xy), dtype=np.uint64)
+    one = np.uint64(1)
+    for bit in range(bits):
+        for dim in range(2):
+            digit = (cells[:, dim] >> np.uint64(bit)) & one
+            code |= digit << np.uint64(2 * bit + dim)
+    return np.argsort(code, kind="stable")
+
+
+def _batch_chunk(template, start, stop, stats, percentiles):
+    "Statistics of centers start to stop of a batch, run by workers."
+    return template._batch_stats(start, stop, stats, percentiles), template.run_stats
@@ -1,12 +1,7 @@
 # -*- coding: utf-8 -*-
 
-import numpy as np
 from osgeo import gdal
 from .base_cir import Base_cir
-from .._slope import Geo_slope
-from .._elevation import Point_elevation
-from ..util import progressBar
-import warnings
 
 
 class Slope_cir(Base_cir):
@@ -28,8 +23,12 @@ class Slope_cir(Base_cir):
     :type ng_stepsize: int, optional
     :param radial_stepsize: radial step-size, defaults to None
     :type radial_stepsize: int, optional
+    :param **kwargs: **kwargs pass to Base_cir, e.g. cache_size
+    :type **kwargs: arbitrary, optional
     """
 
+    cache_params = Base_cir.cache_params + ("min_slope",)
+
     def __init__(
         self,
         center,
@@ -40,67 +39,25 @@ class Slope_cir(Base_cir):
         ng_end=360,
         ng_stepsize=1,
         radial_stepsize=None,
+        **kwargs
     ):
         self.min_slope = min_slope
         # self.max_slope = max_slope
         self.cell_size = gdal.Open(raster).GetGeoTransform()[1]
 
         super(Slope_cir, self).__init__(
-            center, raster, radius, ng_start, ng_end, ng_stepsize, radial_stepsize
+            center,
+            raster,
+            radius,
+            ng_start,
+            ng_end,
+            ng_stepsize,
+            radial_stepsize,
+            **kwargs
         )
 
     def __repr__(self):
         return "{}".format(self.__class__.__name__)
 
     def _radial_lines(self):
-        num = (self.ng_end - self.ng_start) // self.ng_stepsize
-        sector = list(np.arange(self.ng_start, self.ng_end + 0.00001, self.ng_stepsize))
-        radial_line = list(np.arange(0.0, self.radius + 0.00001, self.radial_stepsize))
-
-        lines = []
-        for ng in sector:
-            line_temp = []
-            line_elev = []
-            line_slope = []
-            slope = np.radians(ng)
-            for r in radial_line:
-                dx = r * np.cos(slope)
-                dy = r * np.sin(slope)
-                p = [self.center.x + dx, self.center.y + dy]
-
-                p_elev = Point_elevation(p, self.raster).value
-                p_slope = Geo_slope(p, self.raster, self.cell_size).value
-
-                if not (
-                    (self.rasterXmin <= p[0] <= self.rasterXmax)
-                    and (self.rasterYmin <= p[1] <= self.rasterYmax)
-                    and (p_elev > -1e20)
-                ):
-                    break
-
-                line_temp.append(p)
-                line_elev.append(p_elev)
-                line_slope.append(p_slope)
-
-            # find the maximum elevation point of the line
-            max_ind = line_elev.index(max(line_elev))
-
-            if max_ind == len(line_elev) - 1:
-                lines.append(line_temp)
-                warnings.warn("Radius is small, not reach the rim top.")
-            elif all(i > self.min_slope for i in line_slope[max_ind:None]):
-                lines.append(line_temp)
-            elif all(i < self.min_slope for i in line_slope[max_ind:None]):
-                raise Exception(
-                    "allowed minimum slope is too big " "or radius is too small"
-                )
-            else:
-                for i in range(max_ind, len(line_elev)):
-                    if line_slope[i] < self.min_slope:
-                        lines.append(line_temp[0:i])
-                        break
-
-            current = sector.index(ng)
-            progressBar(current, num)
-
-        return lines
+        return self._threshold_rays(self.slope_grid.values, self.min_slope, "slope")
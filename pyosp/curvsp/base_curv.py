@@ -1,24 +1,46 @@
 # -*- coding: utf-8 -*-
 
+import itertools
+from functools import partial
+from collections import OrderedDict
 from osgeo import gdal
 from shapely.geometry import Polygon, MultiLineString, Point
+from shapely import wkb
 import numpy as np
-from scipy.interpolate import interpn
-from matplotlib.colors import Normalize
-from matplotlib import cm
-import matplotlib.pyplot as plt
-from .._elevation import Point_elevation
-from .._slope import Geo_slope
-from .._tpi import Tpi
-from ..util import read_shape, point_coords
-import copy
+from .._elevation import Raster_sampler
+from .._raster import Tile_cache
+from .._slope import Slope_grid
+from .._tpi import Tpi_grid
+from .._instrument import Run_stats
+from .._ragged import Ragged_swath
+from .._stats import swath_stats, Station_sketch, Value_histogram
+from .._cache import Result_cache
+from .._lazy import Lazy_module
+from .._parallel import parallel_chunks
+from ..util import (
+    read_shape,
+    point_coords,
+    progressBar,
+    line_stations,
+    pairwise,
+    write_npz,
+    read_npz,
+    read_features,
+    subclass_named,
+)
+
+
+# plotting modules, imported by the first plot
+plt = Lazy_module("matplotlib.pyplot")
+cm = Lazy_module("matplotlib.cm")
+colors = Lazy_module("matplotlib.colors")
 
 
 class Base_curv:
     """Abstract class for cuvilinear swath profile.
 
-    :param line: path to baseline shapefile
-    :type line: str
+    :param line: path to baseline shapefile, or the baseline
+    :type line: str or shapely LineString
     :param raster: path to GeoTiff
     :type raster: str
     :param width: maximum allowed width of swath profile
@@ -27,17 +49,92 @@ class Base_curv:
     :type line_stepsize: float, optional
     :param cross_stepsize: step-size along profilelines, defaults to resolution of raster
     :type cross_stepsize: float, optional
+    :param cache_size: memory budget in bytes of cached raster blocks, defaults to None
+        that reads rasters up to 256 MB into memory, and larger ones through a
+        cache of that budget
+    :type cache_size: int, optional
+    :param memmap: map the raster read-only from a .npy sidecar shared by
+        processes, path to the sidecar or True to put it next to the raster,
+        defaults to None
+    :type memmap: str or bool, optional
+    :param progress: called with the current and total number of steps, False
+        to disable, defaults to util.progressBar
+    :type progress: callable or bool, optional
+    :param run_stats: record phase times and raster reads into it, defaults to
+        a new Run_stats
+    :type run_stats: Run_stats, optional
+    :param n_jobs: number of processes building transects in chunks of
+        stations, defaults to None that builds them in this process
+    :type n_jobs: int, optional
+    :param executor: executor running the chunks in processes instead of a
+        new process pool, threads are rejected, defaults to None
+    :type executor: concurrent.futures.Executor, optional
+    :param stream_stats: reduce transects to statistics of each station as
+        soon as they are sampled, and drop profilelines and swath data,
+        defaults to False
+    :type stream_stats: bool, optional
+    :param sketch_bins: number of histogram bins estimating quantiles of each
+        station in streaming mode, defaults to 256
+    :type sketch_bins: int, optional
+    :param value_range: minimum and maximum values spanned by the histogram
+        bins in streaming mode, defaults to None that takes the approximate
+        range of the whole raster. Bins are shared by all stations, so the
+        quantiles of a station are off by up to one bin width,
+        (max - min) / sketch_bins, from numpy's percentiles of values within
+        the range. Pass the range of the swath to refine them
+    :type value_range: tuple of float, optional
+    :param cache_dir: directory keeping built swaths, or station statistics in
+        streaming mode, across runs, or a Result_cache, defaults to None
+    :type cache_dir: str or Result_cache, optional
     """
 
-    def __init__(self, line, raster, width, line_stepsize=None, cross_stepsize=None):
+    # parameters that sweep() can vary, the thresholds of subclasses
+    sweep_params = ("width",)
+
+    def __init__(
+        self,
+        line,
+        raster,
+        width,
+        line_stepsize=None,
+        cross_stepsize=None,
+        cache_size=None,
+        memmap=None,
+        progress=None,
+        run_stats=None,
+        n_jobs=None,
+        executor=None,
+        stream_stats=False,
+        sketch_bins=256,
+        value_range=None,
+        cache_dir=None,
+    ):
         # Empty swath profile is line, width or raster is None
         if None in (line, raster, width):
             return
         else:
-            self.line = read_shape(line)
-            self.raster = gdal.Open(raster)
+            if isinstance(line, str):
+                line = read_shape(line)
+            self.raster_path = raster
             self.width = width
 
+        self.progress = progressBar if progress is None else progress
+        self.run_stats = Run_stats() if run_stats is None else run_stats
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.stream_stats = stream_stats
+        self.sketch_bins = sketch_bins
+        self.value_range = value_range
+        self._value_range = value_range
+        if cache_dir is None or isinstance(cache_dir, Result_cache):
+            self.result_cache = cache_dir
+        else:
+            self.result_cache = Result_cache(cache_dir)
+
+        self.cache_size = cache_size
+        self.memmap = memmap
+        self._open_raster()
+
         # Identify the boundary of raster
         geoTransform = self.raster.GetGeoTransform()
         cols = self.raster.RasterXSize
@@ -52,10 +149,8 @@ class Base_curv:
 
         if line_stepsize is None:
             self.line_stepsize = self.cell_res
-            self.line_p = self._line_points(self.cell_res)
         else:
             self.line_stepsize = line_stepsize
-            self.line_p = self._line_points(line_stepsize)
 
         # Using raster resolution if cross_stepsize is None
         if cross_stepsize is None:
@@ -63,25 +158,722 @@ class Base_curv:
         else:
             self.cross_stepsize = cross_stepsize
 
-        # swath data
+        self._set_line(line)
+
+    def _set_line(self, line):
+        "Place stations along the baseline, swath data are built on first use."
+        self.line = line
+
+        # Stations along the baseline and the directions transects are normal to
+        with self.run_stats.phase("stations"):
+            self.line_xy, self.line_tangents = line_stations(
+                self.line, self.line_stepsize
+            )
+            self.line_p = self._line_points(self.line_stepsize)
+
         self.distance = np.arange(0.0, self.line.length + 1e-10, self.line_stepsize)
-        self.lines = self._transect_lines()
-        self.dat = self.swath_data()
+        self._swath = None
+        self._sketch = None
+        self._segments = {}
+        self._attributes = {}
+        self._lines = None
+        self._dat = None
+
+    def _with_line(self, line):
+        "Return a swath profile of another baseline, sharing raster and caches."
+        profile = object.__new__(self.__class__)
+        profile.__dict__.update(self.__dict__)
+        profile.__dict__.pop("_batch_lines", None)
+        profile._set_line(line)
+        return profile
+
+    @classmethod
+    def batch(
+        cls,
+        lines,
+        raster,
+        width,
+        line_stepsize=None,
+        cross_stepsize=None,
+        n_jobs=None,
+        executor=None,
+        **kwargs
+    ):
+        """Swath profiles of every feature of a shapefile, sharing one raster.
+
+        The raster is opened once, and its sampler and slope or TPI grids
+        are shared by all profiles. Without n_jobs or executor, profiles are
+        yielded at once and built on first use. Otherwise features are split
+        in chunks built by a process pool, each opening the raster once.
+
+        :param lines: path to shapefile of baselines
+        :type lines: str
+        :param raster: path to GeoTiff
+        :type raster: str
+        :param width: maximum allowed width of swath profiles
+        :type width: float
+        :param line_stepsize: step-size along baselines, defaults to resolution of raster
+        :type line_stepsize: float, optional
+        :param cross_stepsize: step-size along profilelines, defaults to resolution of raster
+        :type cross_stepsize: float, optional
+        :param n_jobs: number of processes building swath profiles, defaults to None
+        :type n_jobs: int, optional
+        :param executor: executor running the chunks in processes instead of a
+            new process pool, threads are rejected, defaults to None
+        :type executor: concurrent.futures.Executor, optional
+        :param **kwargs: thresholds of the terrain type and other arguments
+            of the class
+        :type **kwargs: arbitrary, optional
+        :return: feature ID, attributes and swath profile of each feature
+        :rtype: generator of tuple
+        """
+        features = list(read_features(lines))
+        if not features:
+            return
 
-    def _line_points(self, line_stepsize):
-        nPoints = int(self.line.length // line_stepsize)
-        coords = []
-        for i in range(nPoints + 1):
-            p = tuple(self.line.interpolate(line_stepsize * i, normalized=False).coords)
-            coords.append(p[0])
+        template = cls(
+            line=features[0][2],
+            raster=raster,
+            width=width,
+            line_stepsize=line_stepsize,
+            cross_stepsize=cross_stepsize,
+            **kwargs
+        )
+        if n_jobs in (None, 1) and executor is None:
+            for fid, attributes, line in features:
+                yield fid, attributes, template._with_line(line)
+            return
+
+        template._batch_lines = [line for _, _, line in features]
+        chunks = parallel_chunks(
+            template, _batch_chunk, len(features), n_jobs, executor
+        )
+        for start, results in chunks:
+            for (fid, attributes, line), result in zip(features[start:], results):
+                profile = template._with_line(line)
+                if profile.stream_stats:
+                    profile._sketch = result
+                else:
+                    profile.swath = result
+                yield fid, attributes, profile
+
+    @property
+    def swath(self):
+        "Profilelines and their values as a Ragged_swath, built on first use."
+        if self._swath is None:
+            if self.stream_stats:
+                raise ValueError("Swath data are not kept with stream_stats=True")
+            self._swath = self._build_swath()
+        return self._swath
+
+    @swath.setter
+    def swath(self, swath):
+        self._swath = swath
+        self._segments = {}
+        self._attributes = {}
+        self._lines = None
+        self._dat = None
+
+    @property
+    def sketch(self):
+        "Statistics of each station with stream_stats=True, reduced on first use."
+        if self._sketch is None and self.stream_stats:
+            arrays = self._cached("sketch")
+            if arrays is not None:
+                self._sketch = Station_sketch.from_arrays(arrays)
+                return self._sketch
+
+            with self.run_stats.phase("streaming"):
+                self._sketch = self._stream_sketch()
+            self._cache("sketch", self._sketch.arrays())
+        return self._sketch
+
+    @property
+    def lines(self):
+        "Profilelines as nested lists of points, built from swath on first use."
+        if self._lines is None:
+            self._lines = self.swath.to_lines(self.line_p)
+        return self._lines
+
+    @property
+    def dat(self):
+        "Swath data as nested lists of values, built from swath on first use."
+        if self._dat is None:
+            self._dat = self.swath.to_dat()
+        return self._dat
+
+    def __getstate__(self):
+        "Drop the GDAL handle and raster caches, opened again when unpickled."
+        state = self.__dict__.copy()
+        for key in [
+            "_lines",
+            "_dat",
+            "_segments",
+            "_attributes",
+            "raster",
+            "sampler",
+            "_grids",
+            "progress",
+            "executor",
+            "run_stats",
+        ]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._segments = {}
+        self._attributes = {}
+        self._lines = None
+        self._dat = None
+        self.progress = False
+        self.executor = None
+        self.run_stats = Run_stats()
+        if "raster_path" in state:
+            self._open_raster()
+
+    def _open_raster(self):
+        "Open the raster and its sampler."
+        self.raster = gdal.Open(self.raster_path)
+
+        # Read raster blocks through a LRU cache if a budget is given
+        if self.cache_size is None:
+            self.sampler = Raster_sampler(
+                self.raster, memmap=self.memmap, run_stats=self.run_stats
+            )
+        else:
+            cache = Tile_cache(self.raster, self.cache_size, run_stats=self.run_stats)
+            self.sampler = Raster_sampler(
+                self.raster, cache=cache, run_stats=self.run_stats
+            )
+        # slope and TPI grids, one dict shared by copies of batch and sweep
+        self._grids = {}
+
+    def _build_swath(self):
+        "Build and sample transects of all stations, or load them from the cache."
+        arrays = self._cached("swath")
+        if arrays is not None:
+            return Ragged_swath.from_arrays(arrays)
+
+        if self.n_jobs in (None, 1) and self.executor is None:
+            with self.run_stats.phase("transects"):
+                swath = self._transect_lines()
+            with self.run_stats.phase("sampling"):
+                self._sample_lines(swath)
+        else:
+            with self.run_stats.phase("parallel"):
+                swath = self._parallel_lines()
+
+        self._cache("swath", swath.arrays())
+        return swath
+
+    def _cache_key(self, kind):
+        "Key of results of this swath profile in the result cache."
+        names = ("line_stepsize", "cross_stepsize") + self.sweep_params
+        params = {name: getattr(self, name) for name in names}
+        params["kind"] = kind
+        if kind == "sketch":
+            params["sketch_bins"] = self.sketch_bins
+            params["value_range"] = self.value_range
+        return self.result_cache.key(
+            self.raster_path, self.line, self.__class__.__name__, params
+        )
+
+    def _cached(self, kind):
+        "Return cached arrays of kind, None if not cached or no cache is used."
+        if self.result_cache is None:
+            return None
+        with self.run_stats.phase("cache"):
+            return self.result_cache.load(self._cache_key(kind))
+
+    def _cache(self, kind, arrays):
+        "Store arrays of kind in the result cache, if one is used."
+        if self.result_cache is not None:
+            with self.run_stats.phase("cache"):
+                self.result_cache.save(self._cache_key(kind), arrays)
+
+    def _station_range(self, start_ind=None, end_ind=None):
+        "Return the stations selected by slicing with start_ind and end_ind."
+        start, stop, _ = slice(start_ind, end_ind).indices(len(self.line_p))
+        return start, max(start, stop)
+
+    def _station_swath(self, start_ind=None, end_ind=None):
+        """Return profilelines of a range of stations as a Ragged_swath.
+
+        Unless the whole swath is built already, or asked for, only the
+        transects of the range are built and sampled, cached by range.
+        """
+        start, stop = self._station_range(start_ind, end_ind)
+        whole = (start, stop) == (0, len(self.line_p)) and not self.stream_stats
+        if self._swath is not None or whole:
+            return self.swath.take(start, stop)
+
+        if (start, stop) not in self._segments:
+            with self.run_stats.phase("transects"):
+                chunk = self._transect_lines(start, stop)
+            with self.run_stats.phase("sampling"):
+                self._sample_lines(chunk)
+            self._segments[start, stop] = chunk
+        return self._segments[start, stop]
+
+    def _segment_lines(self, start_ind=None, end_ind=None):
+        "Profilelines of a range of stations as nested lists of points."
+        if self._lines is not None:
+            return self._lines[start_ind:end_ind]
+        start, stop = self._station_range(start_ind, end_ind)
+        swath = self._station_swath(start, stop)
+        return swath.to_lines(self.line_p[start:stop])
+
+    def _segment_dat(self, start_ind=None, end_ind=None):
+        "Swath data of a range of stations as nested lists of values."
+        if self._dat is not None:
+            return self._dat[start_ind:end_ind]
+        return self._station_swath(start_ind, end_ind).to_dat()
+
+    def _parallel_lines(self):
+        """Build and sample transects in chunks of stations, in parallel.
+
+        Each chunk is sent with a pickled copy of the swath profile, which
+        opens its own GDAL handle, and results are joined in station order.
+        """
+        chunks = parallel_chunks(
+            self, _transect_chunk, len(self.line_p), self.n_jobs, self.executor
+        )
+        return Ragged_swath.concatenate(chunk for _, chunk in chunks)
+
+    def _stream_sketch(self):
+        "Reduce transects to statistics of each station, serially or in parallel."
+        if self.n_jobs in (None, 1) and self.executor is None:
+            return self._station_sketch()
+
+        sketch = self._empty_sketch(len(self.line_p))
+        chunks = parallel_chunks(
+            self, _sketch_chunk, len(self.line_p), self.n_jobs, self.executor
+        )
+        for start, part in chunks:
+            sketch.merge(part, start)
+        return sketch
+
+    def _raster_range(self):
+        """Return the value range of histogram bins, value_range if given.
 
-        return coords
+        Otherwise the range of the raster is estimated once by GDAL, from
+        overviews or a sample of blocks, without scanning the whole raster.
+        Values beyond it fall in the end bins.
+        """
+        if self._value_range is None:
+            band = self.raster.GetRasterBand(1)
+            self._value_range = band.ComputeRasterMinMax(True)
+        return self._value_range
+
+    def _empty_sketch(self, n_stations):
+        "Return a Station_sketch with bins over the value range of the raster."
+        lo, hi = self._raster_range()
+        return Station_sketch(n_stations, lo, hi, self.sketch_bins)
+
+    def _station_sketch(self, start=0, stop=None, chunk_size=1024):
+        """Build, sample and reduce transects of stations start to stop.
 
-    def _transect_lines(self):
+        Transects are handled chunk_size stations at a time, and their points
+        and values are dropped once reduced.
+        """
+        stop = len(self.line_p) if stop is None else stop
+        sketch = self._empty_sketch(stop - start)
+        for first in range(start, stop, chunk_size):
+            last = min(first + chunk_size, stop)
+            with self.run_stats.phase("transects"):
+                chunk = self._transect_lines(first, last)
+            with self.run_stats.phase("sampling"):
+                self._sample_lines(chunk)
+            with self.run_stats.phase("statistics"):
+                sketch.update(chunk.values, chunk.offsets, first - start)
+        return sketch
+
+    def _station_hist(self, histogram, start=0, stop=None, chunk_size=1024):
+        """Build and sample transects of stations start to stop into histogram.
+
+        Transects are handled chunk_size stations at a time, as
+        _station_sketch.
+        """
+        stop = len(self.line_p) if stop is None else stop
+        for first in range(start, stop, chunk_size):
+            last = min(first + chunk_size, stop)
+            with self.run_stats.phase("transects"):
+                chunk = self._transect_lines(first, last)
+            with self.run_stats.phase("sampling"):
+                self._sample_lines(chunk)
+            with self.run_stats.phase("statistics"):
+                histogram.update(chunk.values)
+        return histogram
+
+    def _progress(self, current, total):
+        "Report progress of the transect building."
+        if self.progress:
+            self.progress(current, total)
+
+    @property
+    def slope_grid(self):
+        "Slope of the raster, calculated tile by tile on first use."
+        if "slope" not in self._grids:
+            self._grids["slope"] = Slope_grid(self.sampler, self.cell_res)
+        return self._grids["slope"]
+
+    def tpi_grid(self, radius):
+        "TPI of the raster with the window radius, calculated tile by tile."
+        if ("tpi", radius) not in self._grids:
+            self._grids["tpi", radius] = Tpi_grid(self.sampler, radius)
+        return self._grids["tpi", radius]
+
+    def _line_points(self, line_stepsize):
+        if line_stepsize == self.line_stepsize:
+            points = self.line_xy
+        else:
+            points, _ = line_stations(self.line, line_stepsize)
+        return [tuple(p) for p in points.tolist()]
+
+    def _transect_lines(self, start=0, stop=None):
         """
         Depend on different terrain type
         """
-        pass
+        return Ragged_swath.concatenate([])
+
+    def _criterion(self):
+        """
+        Values, thresholds and boundary strictness of terrain types growing
+        transects by thresholds, None otherwise
+        """
+        return None
+
+    def _stations(self):
+        """Return transect centres with the baseline directions they are normal to.
+
+        The last point takes the direction of the last segment.
+        """
+        return self.line_xy, self.line_tangents
+
+    def _transect_offsets(self, tangents, distance):
+        """Offsets to the left of baseline directions at distances along transects.
+
+        Right-hand points are centres minus the offsets. Horizontal directions
+        give vertical transects.
+
+        :param tangents: baseline directions
+        :type tangents: (S, 2) array
+        :param distance: distances to the centre
+        :type distance: (K,) array
+        :return: offsets of each direction and distance
+        :rtype: (S, K, 2) ndarray
+        """
+        dx_line = tangents[:, 0][:, None]
+        dy_line = tangents[:, 1][:, None]
+        distance = np.asarray(distance, dtype=float)[None, :]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = -dx_line / dy_line
+            dx = np.sqrt(distance ** 2 / (slope ** 2 + 1))
+            dy = dx * np.abs(slope)
+        horizontal = dy_line == 0
+        dx = np.where(horizontal, 0.0, dx)
+        dy = np.where(horizontal, distance, dy)
+
+        # left is the counterclockwise normal of the direction
+        dx = np.where(dy_line > 0, -dx, dx)
+        dy = np.where(dx_line < 0, -dy, dy)
+        return np.stack([dx, dy], axis=-1)
+
+    def _in_bounds(self, points, strict=False):
+        """Return whether points are within the raster extent.
+
+        :param points: point coordinates
+        :type points: (..., 2) array
+        :param strict: exclude points on the boundary, defaults to False
+        :type strict: bool, optional
+        """
+        x, y = points[..., 0], points[..., 1]
+        if strict:
+            return (
+                (self.rasterXmin < x)
+                & (x < self.rasterXmax)
+                & (self.rasterYmin < y)
+                & (y < self.rasterYmax)
+            )
+        return (
+            (self.rasterXmin <= x)
+            & (x <= self.rasterXmax)
+            & (self.rasterYmin <= y)
+            & (y <= self.rasterYmax)
+        )
+
+    def _in_raster(self, points):
+        """Return whether points are within the raster and not no data.
+
+        :param points: point coordinates
+        :type points: (..., 2) array
+        """
+        points = np.asarray(points, dtype=float)
+        values = self.sampler.values(points.reshape(-1, 2)).reshape(points.shape[:-1])
+        return self._in_bounds(points) & (values > -1e20)
+
+    def _join_sides(self, centres, left, right, n_left, n_right, values=None):
+        """Join both sides of transects into a Ragged_swath.
+
+        :param centres: transect centres
+        :type centres: (S, 2) array
+        :param left: left points, from the centre outward
+        :type left: (S, K, 2) array
+        :param right: right points, from the centre outward
+        :type right: (S, K, 2) array
+        :param n_left: number of left points kept, -1 drops the centre too
+        :type n_left: (S,) array of int
+        :param n_right: number of right points kept
+        :type n_right: (S,) array of int
+        :param values: values of left points, centres and right points, kept
+            the same as the points, defaults to None
+        :type values: tuple of (S, K), (S,) and (S, K) arrays, optional
+        """
+        nPoints = left.shape[1]
+        points = np.concatenate([left[:, ::-1], centres[:, None, :], right], axis=1)
+
+        # kept points are a run around the centre
+        first = np.where(n_left < 0, nPoints + 1, nPoints - n_left)
+        stop = nPoints + 1 + n_right
+        position = np.arange(points.shape[1])
+        keep = (position >= first[:, None]) & (position < stop[:, None])
+
+        offsets = np.concatenate([[0], np.cumsum(stop - first)])
+        base_index = np.where(n_left < 0, -1, n_left)
+        if values is not None:
+            left_values, centre_values, right_values = values
+            values = np.concatenate(
+                [left_values[:, ::-1], centre_values[:, None], right_values], axis=1
+            )[keep]
+        return Ragged_swath(points[keep], offsets, base_index, values)
+
+    def _threshold_lines(
+        self,
+        values,
+        lower,
+        upper,
+        strict=False,
+        start=0,
+        stop=None,
+        chunk_size=2 ** 20,
+    ):
+        """Grow transects outward from the baseline while values are in range.
+
+        Whole candidate transects are evaluated in batches, and each side is
+        cut at its first point off the raster, reaching half of the width or
+        out of [lower, upper], the same as stepping outward point by point.
+
+        :param values: return values of an (N, 2) array of points
+        :type values: callable
+        :param lower: minimal threshold
+        :type lower: float
+        :param upper: maximal threshold
+        :type upper: float
+        :param strict: exclude transect points on the raster boundary,
+            defaults to False
+        :type strict: bool, optional
+        :param start: first station, defaults to 0
+        :type start: int, optional
+        :param stop: station to stop before, defaults to None for the last one
+        :type stop: int, optional
+        :param chunk_size: number of candidate points evaluated at once,
+            defaults to 2 ** 20
+        :type chunk_size: int, optional
+        """
+        num = len(self.line_p)
+        if num < 2:
+            return Ragged_swath.concatenate([])
+
+        centres, tangents = self._stations()
+        half_width = self.width / 2
+        # a couple of spare candidates, as the width is checked on rounded offsets
+        nPoints = int(half_width // self.cross_stepsize) + 2
+        distance = self.cross_stepsize * np.arange(1, nPoints + 1)
+
+        stop = num if stop is None else stop
+        chunks = []
+        step = max(1, chunk_size // nPoints)
+        for first in range(start, stop, step):
+            last = min(first + step, stop)
+            centre_values = values(centres[first:last])
+            centre_in = self._in_bounds(centres[first:last])
+            centre_in &= (lower <= centre_values) & (centre_values <= upper)
+            offsets = self._transect_offsets(tangents[first:last], distance)
+            hw = np.sqrt((offsets ** 2).sum(axis=-1))
+
+            sides = []
+            counts = []
+            for side in (1, -1):
+                points = centres[first:last, None, :] + side * offsets
+                keep = self._in_bounds(points, strict) & (hw < half_width)
+                side_values = np.full(keep.shape, np.nan)
+                side_values[keep] = values(points[keep])
+                keep &= (lower <= side_values) & (side_values <= upper)
+
+                # points are kept up to the first violation
+                n_kept = np.where(keep.all(axis=1), nPoints, (~keep).argmax(axis=1))
+                counts.append(n_kept)
+                sides.append(points)
+
+            counts[0][~centre_in] = -1
+            chunks.append(self._join_sides(centres[first:last], *sides, *counts))
+            self._progress(last, num)
+
+        return Ragged_swath.concatenate(chunks)
+
+    @classmethod
+    def sweep(
+        cls, line, raster, width, line_stepsize=None, cross_stepsize=None, **kwargs
+    ):
+        """Swath profiles for every combination of parameters, sampled once.
+
+        Any parameter of sweep_params may be given as a list of values.
+        Transects of the widest width are sampled once for the raster values
+        and for the values of each criterion, then each combination is cut
+        from them by masking, the same as constructing it on its own.
+
+        :param line: path to baseline shapefile
+        :type line: str
+        :param raster: path to GeoTiff
+        :type raster: str
+        :param width: maximum allowed width of swath profile
+        :type width: float or list of float
+        :param line_stepsize: step-size along baseline, defaults to resolution of raster
+        :type line_stepsize: float, optional
+        :param cross_stepsize: step-size along profilelines, defaults to resolution of raster
+        :type cross_stepsize: float, optional
+        :param **kwargs: thresholds of the terrain type, a value or a list of
+            values, and other arguments of the class
+        :type **kwargs: arbitrary, optional
+        :return: swath profiles keyed by their values of sweep_params
+        :rtype: OrderedDict
+        """
+        # transects are cut from the widest ones, which need a width
+        if width is None or None in np.ravel(width).tolist():
+            raise ValueError("sweep needs the width of swath profiles")
+        kwargs["width"] = width
+        swept = OrderedDict(
+            (name, list(kwargs[name]))
+            for name in cls.sweep_params
+            if name in kwargs and np.ndim(kwargs[name]) == 1
+        )
+
+        # the widest swath profile, sampled once for all combinations
+        init = dict(kwargs, **{name: values[0] for name, values in swept.items()})
+        if "width" in swept:
+            init["width"] = max(swept["width"])
+        base = cls(
+            line=line,
+            raster=raster,
+            line_stepsize=line_stepsize,
+            cross_stepsize=cross_stepsize,
+            **init
+        )
+        if base._criterion() is None:
+            raise TypeError("{} has no thresholds to sweep".format(cls.__name__))
+
+        with base.run_stats.phase("sampling"):
+            candidates = base._sweep_candidates()
+
+        results = OrderedDict()
+        for combination in itertools.product(*swept.values()):
+            # share the raster, sampler and grids, pickling would reopen them
+            profile = cls.__new__(cls)
+            profile.__dict__.update(base.__dict__)
+            for name, value in zip(swept, combination):
+                setattr(profile, name, value)
+            with base.run_stats.phase("transects"):
+                profile.swath = profile._sweep_lines(candidates)
+            key = tuple(getattr(profile, name) for name in cls.sweep_params)
+            results[key] = profile
+
+        return results
+
+    def _sweep_candidates(self, chunk_size=2 ** 20):
+        """Chunks of stations of the widest transects and their raster values.
+
+        Candidate points are rebuilt chunk by chunk when they are needed, only
+        their values are kept for all stations.
+
+        :param chunk_size: number of candidate points evaluated at once,
+            defaults to 2 ** 20
+        :type chunk_size: int, optional
+        """
+        half_width = self.width / 2
+        nPoints = int(half_width // self.cross_stepsize) + 2
+        num = len(self.line_p) if len(self.line_p) >= 2 else 0
+        step = max(1, chunk_size // nPoints)
+        chunks = [(first, min(first + step, num)) for first in range(0, num, step)]
+
+        candidates = {
+            "distance": self.cross_stepsize * np.arange(1, nPoints + 1),
+            "chunks": chunks,
+            "criteria": {},
+        }
+        candidates["raster"] = self._sweep_values(self.sampler.values, candidates)
+        return candidates
+
+    def _sweep_points(self, candidates, first, last):
+        "Centres, left and right candidate points and half widths of a chunk."
+        centres, tangents = self._stations()
+        offsets = self._transect_offsets(tangents[first:last], candidates["distance"])
+        centres = centres[first:last]
+        sides = [centres[:, None, :] + side * offsets for side in (1, -1)]
+        return centres, sides, np.sqrt((offsets ** 2).sum(axis=-1))
+
+    def _sweep_values(self, values, candidates):
+        "Values of centres and of candidate points within the raster extent."
+        chunks = []
+        for first, last in candidates["chunks"]:
+            centres, points, _ = self._sweep_points(candidates, first, last)
+            sides = []
+            for side_points in points:
+                inside = self._in_bounds(side_points)
+                side_values = np.full(inside.shape, np.nan)
+                side_values[inside] = values(side_points[inside])
+                sides.append(side_values)
+            chunks.append((values(centres), sides))
+        return chunks
+
+    def _sweep_lines(self, candidates):
+        "Cut transects of the current parameters from the widest candidates."
+        values, lower, upper, strict = self._criterion()
+        criteria = candidates["criteria"]
+        if values == self.sampler.values:
+            criteria[values] = candidates["raster"]
+        elif values not in criteria:
+            with self.run_stats.phase("sampling"):
+                criteria[values] = self._sweep_values(values, candidates)
+        half_width = self.width / 2
+
+        swaths = []
+        chunks = zip(candidates["chunks"], criteria[values], candidates["raster"])
+        for (first, last), (centre_values, side_values), raster in chunks:
+            centres, sides, hw = self._sweep_points(candidates, first, last)
+            centre_in = self._in_bounds(centres)
+            centre_in &= (lower <= centre_values) & (centre_values <= upper)
+
+            counts = []
+            for points, crit in zip(sides, side_values):
+                keep = self._in_bounds(points, strict) & (hw < half_width)
+                keep &= (lower <= crit) & (crit <= upper)
+                counts.append(
+                    np.where(keep.all(axis=1), keep.shape[1], (~keep).argmax(axis=1))
+                )
+            counts[0][~centre_in] = -1
+
+            raster_centres, raster_sides = raster
+            swaths.append(
+                self._join_sides(
+                    centres,
+                    *sides,
+                    *counts,
+                    values=(raster_sides[0], raster_centres, raster_sides[1])
+                )
+            )
+        return Ragged_swath.concatenate(swaths)
 
     def _segment(self, start=None, end=None):
         if start is not None and isinstance(start, (int, float)):
@@ -116,7 +908,7 @@ class Base_curv:
         :return: polygon of swath area
         """
         start_ind, end_ind = self._segment(start, end)
-        line_segment = self.lines[start_ind:end_ind]
+        line_segment = self._segment_lines(start_ind, end_ind)
 
         try:
             l_points = [x[0] for x in line_segment if x]
@@ -138,7 +930,7 @@ class Base_curv:
         :return: polylines of swath area
         """
         start_ind, end_ind = self._segment(start, end)
-        line_segment = self.lines[start_ind:end_ind]
+        line_segment = self._segment_lines(start_ind, end_ind)
 
         try:
             l_points = [x[0] for x in line_segment if x]
@@ -150,31 +942,188 @@ class Base_curv:
 
         return MultiLineString(lines)
 
+    def to_npz(self, out_file):
+        """Write the swath profile to an uncompressed .npz file, one array per column.
+
+        Written arrays are the station distances, coordinates and directions,
+        the points, values, offsets and baseline index of profilelines, or
+        the station statistics in streaming mode, and summary statistics of
+        each station prefixed by "stat_".
+
+        :param out_file: file path to restore the swath profile
+        :type out_file: str
+        """
+        arrays = {
+            "distance": self.distance,
+            "line_xy": self.line_xy,
+            "line_tangents": self.line_tangents,
+            "line_wkb": np.frombuffer(self.line.wkb, dtype=np.uint8),
+        }
+        if self.stream_stats:
+            for name, arr in self.sketch.arrays().items():
+                arrays["sketch_" + name] = arr
+        else:
+            arrays.update(self.swath.arrays())
+        stat = self.swath_stat(
+            stats=("min", "max", "mean", "std", "count"), percentiles=(25, 50, 75)
+        )
+        for name, arr in stat.items():
+            arrays["stat_" + name] = arr
+
+        meta = {
+            "class": self.__class__.__name__,
+            "raster_path": self.raster_path,
+            "raster_bounds": [
+                self.rasterXmin,
+                self.rasterXmax,
+                self.rasterYmin,
+                self.rasterYmax,
+            ],
+            "cell_res": self.cell_res,
+            "line_stepsize": self.line_stepsize,
+            "cross_stepsize": self.cross_stepsize,
+            "stream_stats": bool(self.stream_stats),
+            "sketch_bins": self.sketch_bins,
+            "value_range": self.value_range,
+            "params": {name: getattr(self, name) for name in self.sweep_params},
+        }
+        write_npz(arrays, meta, out_file)
+
+    @classmethod
+    def from_file(cls, in_file):
+        """Rebuild a swath profile written by to_npz, without opening the raster.
+
+        Data, statistics, plots and outputs of the swath profile are available,
+        methods sampling the raster again, as post-processing, are not.
+
+        :param in_file: file path of the swath profile
+        :type in_file: str
+        :return: swath profile of the class it was written from
+        """
+        arrays, meta = read_npz(in_file)
+        profile = object.__new__(subclass_named(cls, meta["class"]))
+
+        xmin, xmax, ymin, ymax = meta["raster_bounds"]
+        line_xy = arrays["line_xy"]
+        profile.__dict__.update(
+            line=wkb.loads(arrays["line_wkb"].tobytes()),
+            raster_path=meta["raster_path"],
+            raster=None,
+            sampler=None,
+            progress=False,
+            run_stats=Run_stats(),
+            n_jobs=None,
+            executor=None,
+            cache_size=None,
+            memmap=None,
+            result_cache=None,
+            stream_stats=meta["stream_stats"],
+            sketch_bins=meta["sketch_bins"],
+            value_range=meta.get("value_range"),
+            rasterXmin=xmin,
+            rasterXmax=xmax,
+            rasterYmin=ymin,
+            rasterYmax=ymax,
+            cell_res=meta["cell_res"],
+            line_stepsize=meta["line_stepsize"],
+            cross_stepsize=meta["cross_stepsize"],
+            line_xy=line_xy,
+            line_tangents=arrays["line_tangents"],
+            line_p=[tuple(p) for p in line_xy.tolist()],
+            distance=arrays["distance"],
+            _value_range=meta.get("value_range"),
+            _grids={},
+            _swath=None,
+            _sketch=None,
+            _segments={},
+            _attributes={},
+            _lines=None,
+            _dat=None,
+        )
+        profile.__dict__.update(meta["params"])
+
+        if profile.stream_stats:
+            profile._sketch = Station_sketch.from_arrays(
+                {
+                    name[len("sketch_") :]: arr
+                    for name, arr in arrays.items()
+                    if name.startswith("sketch_")
+                }
+            )
+        else:
+            profile._swath = Ragged_swath.from_arrays(arrays)
+        return profile
+
     def swath_data(self):
         """Return a list of elevation data along each profileline"""
-        lines_dat = []
-        try:
-            for line in self.lines:
-                points_temp = []
-                for point in line:
-                    rasterVal = Point_elevation(point, self.raster).value[0, 0]
-                    points_temp.append(rasterVal)
+        values = self.sampler.values(self.swath.xy).tolist()
+        offsets = self.swath.offsets
+        return [values[lo:hi] for lo, hi in zip(offsets[:-1], offsets[1:])]
 
-                lines_dat.append(points_temp)
-        except TypeError:
-            pass
+    def _sample_lines(self, swath):
+        "Sample the values of all points of swath in one pass."
+        swath.values = self.sampler.values(swath.xy)
+        return swath
 
-        return lines_dat
+    def profile_stat(self, z=None, start=None, end=None):
+        """Return a list of summary statistics along each profileline
 
-    def profile_stat(self, z):
-        """Return a list of summary statistics along each profileline"""
-        min_z = [np.nanmin(x) if len(x) > 0 else np.nan for x in z]
-        max_z = [np.nanmax(x) if len(x) > 0 else np.nan for x in z]
-        mean_z = [np.nanmean(x) if len(x) > 0 else np.nan for x in z]
-        q1 = [np.nanpercentile(x, q=25) if len(x) > 0 else np.nan for x in z]
-        q3 = [np.nanpercentile(x, q=75) if len(x) > 0 else np.nan for x in z]
+        :param z: data of profilelines, defaults to None for the swath data
+            from start to end
+        :type z: list or 2D array, optional
+        :param start: starting point, can be coordinates or distance
+        :type start: float or array-like, optional
+        :param end: ending point, can be coordinates or distance
+        :type end: float or array-like, optional
+        """
+        stat = self.swath_stat(z, start=start, end=end)
+        return [list(stat[name]) for name in ("min", "max", "mean", "p25", "p75")]
 
-        return [min_z, max_z, mean_z, q1, q3]
+    def swath_stat(
+        self,
+        z=None,
+        stats=("min", "max", "mean"),
+        percentiles=(25, 75),
+        start=None,
+        end=None,
+    ):
+        """Return summary statistics of each profileline, computed in one pass.
+
+        :param z: data of profilelines, a list per profileline or a matrix with
+            one row per group, defaults to None for the swath data, or the
+            streamed statistics with estimated percentiles
+        :type z: list or 2D array, optional
+        :param stats: statistics among "min", "max", "mean", "std" and
+            "count", defaults to ("min", "max", "mean")
+        :type stats: sequence of str, optional
+        :param percentiles: percentiles to compute, defaults to (25, 75)
+        :type percentiles: sequence of float, optional
+        :param start: starting point of the swath data, only transects from
+            start to end are built if not done yet, can be coordinates or distance
+        :type start: float or array-like, optional
+        :param end: ending point of the swath data, can be coordinates or distance
+        :type end: float or array-like, optional
+        :return: statistics keyed by name, percentiles keyed as "p25", ...
+        :rtype: OrderedDict of ndarray
+        """
+        if z is not None:
+            with self.run_stats.phase("statistics"):
+                return swath_stats(z, stats=stats, percentiles=percentiles)
+
+        start_ind, stop_ind = self._station_range(*self._segment(start, end))
+        if self.stream_stats:
+            whole = (start_ind, stop_ind) == (0, len(self.line_p))
+            if self._sketch is not None or whole:
+                stat = self.sketch.stats(stats, percentiles)
+                return OrderedDict(
+                    (name, val[start_ind:stop_ind]) for name, val in stat.items()
+                )
+            sketch = self._station_sketch(start_ind, stop_ind)
+            return sketch.stats(stats, percentiles)
+
+        swath = self._station_swath(start_ind, stop_ind)
+        with self.run_stats.phase("statistics"):
+            return swath_stats(swath.values, swath.offsets, stats, percentiles)
 
     def plot(
         self,
@@ -234,7 +1183,7 @@ class Base_curv:
                         dist = -dist_noSign
                 else:
                     dist = self.line.project(point)
-                elev = Point_elevation(p, self.raster).value
+                elev = self.sampler.value(p)
                 dist_array = np.append(dist_array, dist)
                 elev_array = np.append(elev_array, elev)
 
@@ -247,7 +1196,16 @@ class Base_curv:
         return ax
 
     def density_scatter(
-        self, distance=None, dat=None, bins=10, start=None, end=None, ax=None, **kwargs
+        self,
+        distance=None,
+        dat=None,
+        bins=10,
+        start=None,
+        end=None,
+        ax=None,
+        image=False,
+        max_points=None,
+        **kwargs
     ):
         """Plot the density scatter of all collected raster values.
         Use 2D histogram approach to discretize the space of swath profile.
@@ -264,56 +1222,65 @@ class Base_curv:
         :param end: ending point, can be coordinates or distance
         :type end: float or array-like, optional
         :param ax: matplotlib axes object, defaults to None
-        :param **kwargs: **kwargs pass to Matplotlib scatter handle
+        :param image: draw the 2D histogram as an image instead of scattering
+            points, for large swaths, defaults to False
+        :type image: bool, optional
+        :param max_points: scatter a random subset of at most max_points
+            points, densities are still of all points, defaults to None
+        :type max_points: int, optional
+        :param **kwargs: **kwargs pass to Matplotlib scatter handle, or to
+            pcolormesh with image=True
         :type **kwargs: arbitrary, optional
         """
         start_ind, end_ind = self._segment(start, end)
-        distance = list(
+        distance = np.asarray(
             self.distance[start_ind:end_ind]
             if distance is None
-            else distance[start_ind:end_ind]
+            else distance[start_ind:end_ind],
+            dtype=float,
         )
-        dat = self.dat[start_ind:end_ind] if dat is None else dat[start_ind:end_ind]
-
-        # delete empty list
-        empty_list = [i for i, x in enumerate(dat) if not x]
-        distance = [i for j, i in enumerate(distance) if j not in empty_list]
-        dat = [i for j, i in enumerate(dat) if j not in empty_list]
+        if dat is None:
+            swath = self._station_swath(start_ind, end_ind)
+            y, counts = swath.values, swath.counts
+        else:
+            rows = dat[start_ind:end_ind]
+            rows = [np.ravel(np.asarray(row, dtype=float)) for row in rows]
+            counts = [len(x) for x in rows]
+            y = np.concatenate(rows) if rows else np.empty(0)
 
-        x, y = np.empty(0), np.empty(0)
-        for ind, dist in enumerate(distance):
-            y_temp = np.stack(dat[ind])
-            y_temp = y_temp[~np.isnan(y_temp)]
-            x_temp = np.repeat(dist, len(y_temp))
-            x = np.append(x, x_temp)
-            y = np.append(y, y_temp)
+        # all points at once, repeating the distance of each profileline
+        x = np.repeat(distance, counts)
+        keep = ~np.isnan(y)
+        x, y = x[keep], y[keep]
 
         data, x_e, y_e = np.histogram2d(x, y, bins=bins, density=True)
-        z = interpn(
-            (0.5 * (x_e[1:] + x_e[:-1]), 0.5 * (y_e[1:] + y_e[:-1])),
-            data,
-            np.vstack([x, y]).T,
-            method="linear",
-            bounds_error=False,
-            fill_value=None,
-        )
-
-        # Sort the points by density
-        idx = z.argsort()
-        x, y, z = x[idx], y[idx], z[idx]
 
         if ax is None:
             fig, ax = plt.subplots()
 
-        ax.scatter(x, y, c=z, **kwargs)
-
-        norm = Normalize(vmin=np.min(z), vmax=np.max(z))
-        if "cmap" in kwargs:
-            cbar = plt.colorbar(
-                cm.ScalarMappable(norm=norm, cmap=kwargs.get("cmap")), ax=ax
-            )
+        if image:
+            mesh = ax.pcolormesh(x_e, y_e, np.ma.masked_equal(data.T, 0), **kwargs)
+            cbar = plt.colorbar(mesh, ax=ax)
         else:
-            cbar = plt.colorbar(cm.ScalarMappable(norm=norm), ax=ax)
+            if max_points is not None and len(x) > max_points:
+                rng = np.random.default_rng(0)
+                pick = np.sort(rng.choice(len(x), max_points, replace=False))
+                x, y = x[pick], y[pick]
+            z = _grid_linear(data, x_e, y_e, x, y)
+
+            # Sort the points by density
+            idx = z.argsort()
+            x, y, z = x[idx], y[idx], z[idx]
+
+            ax.scatter(x, y, c=z, **kwargs)
+
+            norm = colors.Normalize(vmin=np.min(z), vmax=np.max(z))
+            if "cmap" in kwargs:
+                cbar = plt.colorbar(
+                    cm.ScalarMappable(norm=norm, cmap=kwargs.get("cmap")), ax=ax
+                )
+            else:
+                cbar = plt.colorbar(cm.ScalarMappable(norm=norm), ax=ax)
 
         cbar.ax.set_ylabel("Density")
         ax.set_xlabel("Distance")
@@ -338,13 +1305,13 @@ class Base_curv:
         :param **kwargs: **kwargs pass to Matplotlib scatter handle
         :type **kwargs: arbitrary, optional
         """
-        distance = self.distance
-        stat = self.profile_stat(self.dat)
+        # only the statistics of the plotted segment are computed
+        start_ind, end_ind = self._segment(start, end)
+        distance = self.distance[start_ind:end_ind]
+        stat = self.profile_stat(start=start, end=end)
         self.plot(
             distance=distance,
             stat=stat,
-            start=start,
-            end=end,
             ax=ax,
             color=color,
             points=points,
@@ -366,7 +1333,7 @@ class Base_curv:
             distance = np.sum((line_coords - loc_coords) ** 2, axis=1)
             loc_ind = np.argmin(distance)
 
-        line = self.lines[loc_ind]
+        line = self._segment_lines(loc_ind, loc_ind + 1)[0]
 
         d = []
         for point in line:
@@ -378,38 +1345,75 @@ class Base_curv:
         if ax is None:
             fig, ax = plt.subplots()
 
-        ax.plot(d, self.dat[loc_ind])
+        ax.plot(d, self._segment_dat(loc_ind, loc_ind + 1)[0])
         ax.set_xlabel("Distance to left end")
         ax.set_ylabel("Elevation")
         ax.grid()
         plt.tight_layout()
         return ax
 
+    def value_hist(self, dat=None, bins=50):
+        """Return the histogram of swath data in fixed bins.
+
+        With stream_stats=True, transects are built again and binned chunk by
+        chunk of stations, in parallel with n_jobs, into bins over value_range,
+        or the approximate range of the raster, and swath data are not kept.
+
+        :param dat: input data, defaults to all swath data
+        :type dat: nested list, optional
+        :param bins: number of bins, or bin edges, defaults to 50
+        :type bins: int or array-like, optional
+        :rtype: Value_histogram
+        """
+        if dat is not None:
+            values = [np.ravel(np.asarray(ele, dtype=float)) for ele in dat]
+            values = np.concatenate(values) if values else np.empty(0)
+            return Value_histogram.from_values(values, bins)
+        if not self.stream_stats:
+            return Value_histogram.from_values(self.swath.values, bins)
+
+        if np.ndim(bins) == 0:
+            histogram = Value_histogram.from_range(*self._raster_range(), bins)
+        else:
+            histogram = Value_histogram(bins)
+
+        with self.run_stats.phase("streaming"):
+            if self.n_jobs in (None, 1) and self.executor is None:
+                return self._station_hist(histogram)
+
+            worker = partial(_hist_chunk, edges=histogram.edges)
+            chunks = parallel_chunks(
+                self, worker, len(self.line_p), self.n_jobs, self.executor
+            )
+            for _, part in chunks:
+                histogram.merge(part)
+        return histogram
+
     def hist(self, dat=None, ax=None, bins=50, **kwargs):
         """Return a histogram plot
 
         :param dat: Input data, defaults to all swath data
         :type dat: nested list, optional
         :param ax: Matplotlib axes object, defaults to None
-        :param bins: number of binds, defaults to 50
-        :type bins: int, optional
+        :param bins: number of bins, or bin edges, defaults to 50
+        :type bins: int or array-like, optional
         :return: Matplotlib axes object
         """
 
-        dat = self.dat if dat is None else dat
-
-        # see if it is a nested list
-        if any(isinstance(i, list) for i in dat):
-            dat_array = np.empty(0)
-            for i in dat:
-                dat_array = np.append(dat_array, np.hstack(i))
-        else:
-            dat_array = dat
+        histogram = self.value_hist(dat=dat, bins=bins)
 
         if ax is None:
             fig, ax = plt.subplots()
 
-        ax.hist(dat_array, bins=bins, histtype="stepfilled", density=True, **kwargs)
+        # draw from the counts, each bin weighted by its count
+        ax.hist(
+            histogram.edges[:-1],
+            bins=histogram.edges,
+            weights=histogram.counts,
+            histtype="stepfilled",
+            density=True,
+            **kwargs
+        )
         ax.set_xlabel("Elevation")
         ax.set_ylabel("PDF")
         # ax.grid()
@@ -432,7 +1436,7 @@ class Base_curv:
             distance = np.sum((line_coords - loc_coords) ** 2, axis=1)
             loc_ind = np.argmin(distance)
 
-        dat = self.dat[loc_ind]
+        dat = self._segment_dat(loc_ind, loc_ind + 1)[0]
 
         self.hist(dat=dat, bins=bins)
 
@@ -445,23 +1449,23 @@ class Base_curv:
         :type start: float or array-like, optional
         :param end: Ending position of cross-swath, defaults to ending point of baseline
         :type end: float or array-like, optional
-        :return: A dict specify distance from the baseline, and corresponding swath data.
+        :return: A dict specify distance from the baseline, and corresponding swath data
+            as a NaN-padded matrix, one row per distance and one column per profileline.
         :rtype: dict
         """
         start_ind, end_ind = self._segment(start, end)
-        dat = self.dat[start_ind:end_ind] if dat is None else dat
-
-        data = [ele for ele in dat if ele != []]
-        lines = [line for line in self.lines[start_ind:end_ind] if line != []]
+        swath = self._station_swath(start_ind, end_ind)
+        if dat is None:
+            values = swath.values
+        else:
+            values = [np.ravel(np.asarray(ele, dtype=float)) for ele in dat]
+            values = np.concatenate(values) if values else np.empty(0)
 
-        # only baseline point was restored as tuple, others were lists
-        left = []
-        right = []
-        for i in lines:
-            left_num = i.index([x for x in i if isinstance(x, tuple)][0])
-            right_num = len(i) - left_num - 1
-            left.append(left_num)
-            right.append(right_num)
+        # points on each side of the baseline point, -1 if it is not included
+        counts = swath.counts
+        nonempty = counts > 0
+        left = swath.base_index[nonempty]
+        right = counts[nonempty] - left - 1
 
         left_max = max(left)
         right_max = max(right)
@@ -473,21 +1477,16 @@ class Base_curv:
         )
         distance = np.hstack((left_dist[::-1], right_dist[1:None]))
 
-        # cross_matrix = np.zeros((len(distance), len(self.lines[start:end])))
-        cross_profile = []
-        for count, ele in enumerate(data):
-            line_dat = np.vstack(ele).flatten()
-            line_pad = np.pad(
-                line_dat,
-                (left_max - left[count], right_max - right[count]),
-                "constant",
-                constant_values=np.nan,
-            )
-            cross_profile.append(line_pad)
+        # scatter values into rows aligned on the baseline point
+        line = np.repeat(np.arange(len(left)), counts[nonempty])
+        shift = left_max - left - swath.offsets[:-1][nonempty]
+        row = np.arange(len(values)) + np.repeat(shift, counts[nonempty])
+        cross_matrix = np.full((left_max + right_max + 1, len(left)), np.nan)
+        cross_matrix[row, line] = values
 
         return {
             "distance": distance,
-            "cross_matrix": list(map(list, zip(*cross_profile))),
+            "cross_matrix": cross_matrix,
         }
 
     def cross_plot(
@@ -538,6 +1537,148 @@ class Base_curv:
                 **kwargs
             )
 
+    def _point_attribute(self, attribute, start_ind=None, end_ind=None):
+        """Return an attribute of all points of a range of stations, flat.
+
+        Attributes are "elev", read from the swath data, and "slope" or
+        ("tpi", radius), sampled from their grids in one call and kept, so
+        filtering the same range again reads no raster.
+        """
+        start, stop = self._station_range(start_ind, end_ind)
+        swath = self._station_swath(start, stop)
+        if attribute == "elev":
+            return swath.values
+
+        key = (attribute, start, stop)
+        if key not in self._attributes:
+            if attribute == "slope":
+                grid = self.slope_grid
+            elif isinstance(attribute, tuple) and attribute[0] == "tpi":
+                grid = self.tpi_grid(attribute[1])
+            else:
+                raise ValueError("Unknown attribute: {!r}".format(attribute))
+            self._attributes[key] = grid.values(swath.xy)
+        return self._attributes[key]
+
+    def _post_process(
+        self,
+        ranges,
+        start=None,
+        end=None,
+        ax=None,
+        color="navy",
+        cross=False,
+        swath_plot=False,
+        bins=10,
+        density_scatter=False,
+        **kwargs
+    ):
+        """Mask swath data out of attribute ranges, then plot as asked.
+
+        Return distance, masked values as post_elev, and the flat mask of
+        kept points.
+        """
+        if swath_plot and density_scatter:
+            raise Exception(
+                "Swath profile and density scatters are not "
+                "meant to be plotted at the same time."
+            )
+
+        start_ind, end_ind = self._segment(start, end)
+        swath = self._station_swath(start_ind, end_ind)
+        keep = np.ones(len(swath.values), dtype=bool)
+        for attribute, min_val, max_val in ranges:
+            point_val = self._point_attribute(attribute, start_ind, end_ind)
+            keep &= (min_val <= point_val) & (point_val <= max_val)
+
+        masked = np.where(keep, swath.values, np.nan)
+        lines_val = Ragged_swath(
+            swath.xy, swath.offsets, swath.base_index, masked
+        ).to_dat()
+        distance = self.distance[start_ind:end_ind]
+        values = lines_val
+
+        if cross == True:
+            cross_dat = self.cross_dat(dat=lines_val, start=start, end=end)
+            distance = cross_dat["distance"]
+            values = cross_dat["cross_matrix"]
+
+        if swath_plot == True:
+            post_stat = self.profile_stat(values)
+            self.plot(distance=distance, stat=post_stat, ax=ax, color=color)
+
+        if density_scatter == True:
+            self.density_scatter(
+                distance=distance, dat=values, bins=bins, ax=ax, **kwargs
+            )
+
+        return distance, values, keep
+
+    def post_filter(
+        self,
+        ranges,
+        start=None,
+        end=None,
+        ax=None,
+        color="navy",
+        cross=False,
+        swath_plot=False,
+        bins=10,
+        density_scatter=False,
+        **kwargs
+    ):
+        """Post-processing swath data according to several criteria at once.
+
+        Each attribute is evaluated for all points of the segment in one
+        call, and a point is kept only if all of them are in range.
+
+        :param ranges: minimal and maximal thresholds of each attribute, keyed
+            by "elev", "slope" or ("tpi", radius)
+        :type ranges: dict
+        :param start: starting point, can be coordinates or distance
+        :type start: float or array-like, optional
+        :param end: ending point, can be coordinates or distance
+        :type end: float or array-like, optional
+        :param ax: matplotlib axes object, defaults to None
+        :param color: color of quartiles, defaults to 'navy'
+        :type color: str, optional
+        :param cross: processing cross-swath profile, defaults to False
+        :type cross: bool, optional
+        :param swath_plot: plot the processed swath profile, defaults to False
+        :type swath_plot: bool, optional
+        :param bins: number of bin for density scatter, defaults to 10
+        :type bins: int, optional
+        :param density_scatter: plot the processed density scatter, defaults to False
+        :type density_scatter: bool, optional
+        :param **kwargs: **kwargs pass to Matplotlib scatter handle
+        :type **kwargs: arbitrary, optional
+        :return: a list contain distance, processed elevation data, and the mask
+            of kept points in the same layout as the data
+        :rtype: list
+        """
+        distance, values, keep = self._post_process(
+            [(attribute, lo, hi) for attribute, (lo, hi) in ranges.items()],
+            start=start,
+            end=end,
+            ax=ax,
+            color=color,
+            cross=cross,
+            swath_plot=swath_plot,
+            bins=bins,
+            density_scatter=density_scatter,
+            **kwargs
+        )
+
+        if cross == True:
+            kept = self.cross_dat(dat=[keep.astype(float)], start=start, end=end)
+            mask = kept["cross_matrix"] == 1
+        else:
+            start_ind, end_ind = self._segment(start, end)
+            offsets = self._station_swath(start_ind, end_ind).offsets
+            mask = [keep[lo:hi].tolist() for lo, hi in pairwise(offsets)]
+
+        return [distance, values, mask]
+
     def post_tpi(
         self,
         radius,
@@ -581,38 +1722,18 @@ class Base_curv:
         :return: a list contain distance and processed elevation data
         :rtype: list
         """
-        if swath_plot and density_scatter:
-            raise Exception(
-                "Swath profile and density scatters are not "
-                "meant to be plotted at the same time."
-            )
-
-        start_ind, end_ind = self._segment(start, end)
-
-        lines_val = copy.deepcopy(self.dat[start_ind:end_ind])
-        for line_ind, line in enumerate(self.lines[start_ind:end_ind]):
-            for point_ind, point in enumerate(line):
-                point_val = Tpi(point, self.raster, radius).value
-                if not min_val <= point_val <= max_val:
-                    lines_val[line_ind][point_ind] = np.nan
-
-        distance = self.distance[start_ind:end_ind]
-        values = lines_val
-
-        if cross == True:
-            cross_dat = self.cross_dat(dat=lines_val, start=start, end=end)
-            distance = cross_dat["distance"]
-            values = cross_dat["cross_matrix"]
-
-        if swath_plot == True:
-            post_stat = self.profile_stat(values)
-            self.plot(distance=distance, stat=post_stat, ax=ax, color=color)
-
-        if density_scatter == True:
-            self.density_scatter(
-                distance=distance, dat=values, bins=bins, ax=ax, **kwargs
-            )
-
+        distance, values, _ = self._post_process(
+            [(("tpi", radius), min_val, max_val)],
+            start=start,
+            end=end,
+            ax=ax,
+            color=color,
+            cross=cross,
+            swath_plot=swath_plot,
+            bins=bins,
+            density_scatter=density_scatter,
+            **kwargs
+        )
         return [distance, values]
 
     def post_elev(
@@ -655,38 +1776,18 @@ class Base_curv:
         :return: a list contain distance and processed elevation data
         :rtype: list
         """
-        if swath_plot and density_scatter:
-            raise Exception(
-                "Swath profile and density scatters are not "
-                "meant to be plotted at the same time."
-            )
-
-        start_ind, end_ind = self._segment(start, end)
-
-        lines_val = copy.deepcopy(self.dat[start_ind:end_ind])
-        for line_ind, line in enumerate(self.lines[start_ind:end_ind]):
-            for point_ind, point in enumerate(line):
-                point_val = Point_elevation(point, self.raster).value
-                if not min_val <= point_val <= max_val:
-                    lines_val[line_ind][point_ind] = np.nan
-
-        distance = self.distance[start_ind:end_ind]
-        values = lines_val
-
-        if cross == True:
-            cross_dat = self.cross_dat(dat=lines_val, start=start, end=end)
-            distance = cross_dat["distance"]
-            values = cross_dat["cross_matrix"]
-
-        if swath_plot == True:
-            post_stat = self.profile_stat(values)
-            self.plot(distance=distance, stat=post_stat, ax=ax, color=color)
-
-        if density_scatter == True:
-            self.density_scatter(
-                distance=distance, dat=values, bins=bins, ax=ax, **kwargs
-            )
-
+        distance, values, _ = self._post_process(
+            [("elev", min_val, max_val)],
+            start=start,
+            end=end,
+            ax=ax,
+            color=color,
+            cross=cross,
+            swath_plot=swath_plot,
+            bins=bins,
+            density_scatter=density_scatter,
+            **kwargs
+        )
         return [distance, values]
 
     def post_slope(
@@ -729,36 +1830,71 @@ class Base_curv:
         :return: a list contain distance and processed slope data
         :rtype: list
         """
-        if swath_plot and density_scatter:
-            raise Exception(
-                "Swath profile and density scatters are not "
-                "meant to be plotted at the same time."
-            )
-
-        start_ind, end_ind = self._segment(start, end)
-
-        lines_val = copy.deepcopy(self.dat[start_ind:end_ind])
-        for line_ind, line in enumerate(self.lines[start_ind:end_ind]):
-            for point_ind, point in enumerate(line):
-                point_val = Geo_slope(point, self.raster, self.cell_res).value
-                if not min_val <= point_val <= max_val:
-                    lines_val[line_ind][point_ind] = np.nan
-
-        distance = self.distance[start_ind:end_ind]
-        values = lines_val
-
-        if cross == True:
-            cross_dat = self.cross_dat(dat=lines_val, start=start, end=end)
-            distance = cross_dat["distance"]
-            values = cross_dat["cross_matrix"]
+        distance, values, _ = self._post_process(
+            [("slope", min_val, max_val)],
+            start=start,
+            end=end,
+            ax=ax,
+            color=color,
+            cross=cross,
+            swath_plot=swath_plot,
+            bins=bins,
+            density_scatter=density_scatter,
+            **kwargs
+        )
+        return [distance, values]
 
-        if swath_plot == True:
-            post_stat = self.profile_stat(values)
-            self.plot(distance=distance, stat=post_stat, ax=ax, color=color)
 
-        if density_scatter == True:
-            self.density_scatter(
-                distance=distance, dat=values, bins=bins, ax=ax, **kwargs
-            )
+def _grid_linear(data, x_edges, y_edges, x, y):
+    """Interpolate a 2D histogram at points, linearly between bin centers.
 
-        return [distance, values]
+    Bins of each point are found by direct indexing into the bin centers,
+    values beyond the outer centers are extrapolated, the same as
+    scipy.interpolate.interpn with fill_value=None.
+    """
+    corners = []
+    for edges, coords in [(x_edges, x), (y_edges, y)]:
+        centers = 0.5 * (edges[1:] + edges[:-1])
+        last = len(centers) - 1
+        below = np.clip(np.searchsorted(centers, coords) - 1, 0, max(last - 1, 0))
+        above = np.minimum(below + 1, last)
+        # a single bin has no neighbour to interpolate with, it takes it all
+        span = centers[above] - centers[below]
+        t = np.zeros(len(coords))
+        np.divide(coords - centers[below], span, out=t, where=above != below)
+        corners.append([(below, 1 - t), (above, t)])
+
+    z = np.zeros(len(x))
+    for i, wx in corners[0]:
+        for j, wy in corners[1]:
+            z += data[i, j] * wx * wy
+    return z
+
+
+def _transect_chunk(swath, start, stop):
+    "Build and sample transects of stations start to stop, run by workers."
+    with swath.run_stats.phase("transects"):
+        chunk = swath._transect_lines(start, stop)
+    with swath.run_stats.phase("sampling"):
+        swath._sample_lines(chunk)
+    return chunk, swath.run_stats
+
+
+def _sketch_chunk(swath, start, stop):
+    "Reduce transects of stations start to stop to statistics, run by workers."
+    return swath._station_sketch(start, stop), swath.run_stats
+
+
+def _hist_chunk(swath, start, stop, edges):
+    "Bin values of transects of stations start to stop, run by workers."
+    histogram = swath._station_hist(Value_histogram(edges), start, stop)
+    return histogram, swath.run_stats
+
+
+def _batch_chunk(template, start, stop):
+    "Build swath profiles of baselines start to stop of a batch, run by workers."
+    results = []
+    for line in template._batch_lines[start:stop]:
+        profile = template._with_line(line)
+        results.append(profile.sketch if profile.stream_stats else profile.swath)
+    return results, template.run_stats
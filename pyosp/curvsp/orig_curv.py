@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-from ..util import pairwise, progressBar
+from .._ragged import Ragged_swath
 from .base_curv import Base_curv
-from .._elevation import Point_elevation
 
 
 class Orig_curv(Base_curv):
@@ -19,125 +18,53 @@ class Orig_curv(Base_curv):
     :type line_stepsize: float, optional
     :param cross_stepsize: step-size along profilelines, defaults to resolution of raster
     :type cross_stepsize: float, optional
+    :param **kwargs: **kwargs pass to Base_curv, e.g. cache_size
+    :type **kwargs: arbitrary, optional
     """
 
-    def __init__(self, line, raster, width, line_stepsize=None, cross_stepsize=None):
+    def __init__(
+        self, line, raster, width, line_stepsize=None, cross_stepsize=None, **kwargs
+    ):
 
         super(Orig_curv, self).__init__(
-            line, raster, width, line_stepsize, cross_stepsize
+            line, raster, width, line_stepsize, cross_stepsize, **kwargs
         )
 
     def __repr__(self):
         return "{}".format(self.__class__.__name__)
 
-    def _transect_lines(self):
-        lines = []
+    def _transect_lines(self, start=0, stop=None, chunk_size=2 ** 20):
         num = len(self.line_p)
+        if num < 2:
+            return Ragged_swath.concatenate([])
 
-        for p1, p2 in pairwise(self.line_p):
-            if p2 == self.line_p[-1]:
-                line_left_1 = self._swath_left(p1, p2)
-                line_right_1 = self._swath_right(p1, p2)
-                line_1 = line_left_1 + line_right_1
-
-                line_left_2 = self._swath_left(p1, p2, endPoint=True)
-                line_right_2 = self._swath_right(p1, p2, endPoint=True)
-                line_2 = line_left_2 + line_right_2
-
-                lines.append(line_1)
-                lines.append(line_2)
-
-                current = self.line_p.index(p2) + 1  # processed two points at last step
-                progressBar(current, num)
-            else:
-                line_left = self._swath_left(p1, p2)
-                line_right = self._swath_right(p1, p2)
-                line = line_left + line_right
-
-                lines.append(line)
-
-                current = self.line_p.index(p2)
-                progressBar(current, num)
-
-        return lines
-
-    def _swath_left(self, p1, p2, endPoint=False):
-        # if touch the end point, using same slope for both last two points
-        if endPoint:
-            p_m = p2
-        else:
-            p_m = p1
-
-        rasterVal = Point_elevation(p_m, self.raster).value
-        if not (
-            (self.rasterXmin <= p_m[0] <= self.rasterXmax)
-            and (self.rasterYmin <= p_m[1] <= self.rasterYmax)
-            and (rasterVal > -1e20)
-        ):
-            transect_temp = []
-        else:
-            transect_temp = [p_m]
-            nPoints = int(self.width / 2 // self.cross_stepsize)
-            slope = -(p2[0] - p1[0]) / (p2[1] - p1[1])
-            for i in range(nPoints):
-                dx = np.sqrt((self.cross_stepsize * (i + 1)) ** 2 / (slope ** 2 + 1))
-                dy = dx * abs(slope)
-
-                if slope >= 0 and p2[0] < p1[0] and p2[1] >= p1[1]:
-                    p_left = [p_m[0] - dx, p_m[1] - dy]
-                elif slope >= 0 and p2[0] >= p1[0] and p2[1] < p1[1]:
-                    p_left = [p_m[0] + dx, p_m[1] + dy]
-                elif slope < 0 and p2[0] < p1[0] and p2[1] < p1[1]:
-                    p_left = [p_m[0] + dx, p_m[1] - dy]
-                elif slope < 0 and p2[0] >= p1[0] and p2[1] >= p1[1]:
-                    p_left = [p_m[0] - dx, p_m[1] + dy]
-
-                # discard point out of bounds
-                rasterVal = Point_elevation(p_left, self.raster).value
-                if not (
-                    (self.rasterXmin <= p_left[0] <= self.rasterXmax)
-                    and (self.rasterYmin <= p_left[1] <= self.rasterYmax)
-                    and (rasterVal > -1e20)
-                ):
-                    break
-
-                transect_temp.insert(0, p_left)
-
-        return transect_temp
-
-    def _swath_right(self, p1, p2, endPoint=False):
-        # if touch the end point, using same slope for both last two points
-        if endPoint:
-            p_m = p2
-        else:
-            p_m = p1
-
-        transect_temp = []
-
+        # transects have a fixed width, built for a chunk of stations at once
+        stop = num if stop is None else stop
+        centres, tangents = self._stations()
         nPoints = int(self.width / 2 // self.cross_stepsize)
-        slope = -(p2[0] - p1[0]) / (p2[1] - p1[1])
-        for i in range(nPoints):
-            dx = np.sqrt((self.cross_stepsize * (i + 1)) ** 2 / (slope ** 2 + 1))
-            dy = dx * abs(slope)
-
-            if slope >= 0 and p2[0] < p1[0] and p2[1] >= p1[1]:
-                p_right = [p_m[0] + dx, p_m[1] + dy]
-            elif slope >= 0 and p2[0] >= p1[0] and p2[1] < p1[1]:
-                p_right = [p_m[0] - dx, p_m[1] - dy]
-            elif slope < 0 and p2[0] < p1[0] and p2[1] < p1[1]:
-                p_right = [p_m[0] - dx, p_m[1] + dy]
-            elif slope < 0 and p2[0] >= p1[0] and p2[1] >= p1[1]:
-                p_right = [p_m[0] + dx, p_m[1] - dy]
-
-            # discard point out of bounds
-            rasterVal = Point_elevation(p_right, self.raster).value
-            if not (
-                (self.rasterXmin <= p_right[0] <= self.rasterXmax)
-                and (self.rasterYmin <= p_right[1] <= self.rasterYmax)
-                and (rasterVal > -1e20)
-            ):
-                break
-
-            transect_temp.append(p_right)
-
-        return transect_temp
+        distance = self.cross_stepsize * np.arange(1, nPoints + 1)
+
+        chunks = []
+        step = max(1, chunk_size // (nPoints + 1))
+        for first in range(start, stop, step):
+            last = min(first + step, stop)
+            offsets = self._transect_offsets(tangents[first:last], distance)
+
+            # keep points up to the first one out of bounds
+            sides = []
+            counts = []
+            for side in (1, -1):
+                points = centres[first:last, None, :] + side * offsets
+                keep = self._in_raster(points)
+                # a closing False column counts all points of narrow transects
+                keep = np.hstack([keep, np.zeros((len(keep), 1), dtype=bool)])
+                n_kept = keep.argmin(axis=1)
+                counts.append(n_kept)
+                sides.append(points)
+
+            # left side needs the centre
+            counts[0][~self._in_raster(centres[first:last])] = -1
+            chunks.append(self._join_sides(centres[first:last], *sides, *counts))
+            self._progress(last, num)
+
+        return Ragged_swath.concatenate(chunks)
@@ -56,3 +56,18 @@ class TestPost:
         orig = orig_cir()
         orig.slice_hist(angle=200, bins=20)
         assert True
+
+    def test_post_filter(self, orig_cir):
+        """Kept points are the ones in all ranges, in the layout of the data"""
+        orig = orig_cir()
+        ranges = {"elev": (0, 4), "slope": (5, 30)}
+        distance, values, mask = orig.post_filter(ranges)
+        assert len(distance) == orig.dat_steps
+        for line, line_mask, line_dat, points in zip(
+            values, mask, orig.dat, orig.lines
+        ):
+            assert not line_mask[len(points) :].any()
+            for i, point in enumerate(points):
+                kept = 0 <= line_dat[i] <= 4 and 5 <= orig.slope_grid.value(point) <= 30
+                assert line_mask[i] == kept
+                assert line[i] == line_dat[i] if kept else np.isnan(line[i])
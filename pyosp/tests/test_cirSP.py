@@ -4,6 +4,7 @@ import pytest
 import os, sys
 import pyosp
 import numpy as np
+from shapely.geometry import Point
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 dat = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../datasets/")
@@ -87,3 +88,79 @@ class TestCir:
             p_dat_out.append(dat_out)
 
         assert all(i < 2 for i in p_dat_out)
+
+    def test_result_cache(self, slope_cir, tmp_path):
+        """Radial lines and data are loaded from the cache directory"""
+        slope = slope_cir(cache_dir=str(tmp_path), progress=False)
+        assert slope.lines is not None
+        again = slope_cir(cache_dir=str(tmp_path), progress=False)
+        assert again.lines == slope.lines
+        assert np.array_equal(again.dat, slope.dat, equal_nan=True)
+        assert "transects" not in again.run_stats.phase_time
+
+    def test_npz(self, elev_cir, tmp_path):
+        """Circular swath profiles are rebuilt from files without the raster"""
+        elev = elev_cir(progress=False)
+        out_file = str(tmp_path / "elev.npz")
+        elev.to_npz(out_file)
+
+        loaded = pyosp.Base_cir.from_file(out_file)
+        assert isinstance(loaded, pyosp.Elev_cir) and loaded.raster is None
+        assert loaded.lines == elev.lines
+        assert np.array_equal(loaded.dat, elev.dat, equal_nan=True)
+        assert np.allclose(loaded.profile_stat(), elev.profile_stat(), equal_nan=True)
+
+    def test_batch(self):
+        """Statistics of a batch equal to the ones of profiles built one by one"""
+        raster = os.path.join(dat, "crater.tif")
+        center = pyosp.read_shape(os.path.join(dat, "center.shp"))
+        xy = [(center.x + dx, center.y - dx) for dx in (10, -10, 0)] + [(-1e9, 0)]
+        kwargs = dict(min_elev=4, ng_end=300, ng_stepsize=10, progress=False)
+
+        table = pyosp.Elev_cir.batch(xy, raster, 80, **kwargs)
+        columns = ["fid", "x", "y", "valid", "min", "max", "mean", "p25", "p75"]
+        assert list(table) == columns
+        assert table["valid"].tolist() == [True, True, True, False]
+        for i, (x, y) in enumerate(xy[:-1]):
+            elev = pyosp.Elev_cir(Point(x, y), raster, 80, **kwargs)
+            for name, values in elev.swath_stat().items():
+                assert np.allclose(
+                    table[name][i, : len(values)], values, equal_nan=True
+                )
+        assert np.isnan(table["mean"][-1]).all()
+
+        jobs = pyosp.Elev_cir.batch(xy, raster, 80, n_jobs=2, **kwargs)
+        for name, values in table.items():
+            assert np.array_equal(jobs[name], values, equal_nan=True)
+
+        kwargs["min_elev"] = 1e9
+        with pytest.raises(pyosp.Threshold_error):
+            pyosp.Elev_cir(Point(xy[0]), raster, 80, **kwargs).lines
+        assert not pyosp.Elev_cir.batch(xy, raster, 80, **kwargs)["valid"].any()
+
+    def test_batch_grids(self):
+        """Centers of a batch share one slope grid"""
+        raster = os.path.join(dat, "crater.tif")
+        center = pyosp.read_shape(os.path.join(dat, "center.shp"))
+        xy = [(center.x + dx, center.y) for dx in (-10, 0, 10)]
+        kwargs = dict(min_slope=13, ng_end=300, ng_stepsize=10, progress=False)
+        stats, single = pyosp.Run_stats(), pyosp.Run_stats()
+        pyosp.Slope_cir.batch(xy, raster, 80, run_stats=stats, **kwargs)
+        pyosp.Slope_cir(center, raster, 80, run_stats=single, **kwargs).lines
+        assert stats.phase_calls["slope"] == single.phase_calls["slope"]
+
+    def test_radial_points(self, elev_cir):
+        """Rays sampled in one pass end where stepping point by point does"""
+        elev = elev_cir()
+        radii = np.arange(0.0, elev.radius + 0.00001, elev.radial_stepsize)
+        for ng, line in zip(range(elev.ng_start, elev.ng_end + 1), elev.lines):
+            angle = np.radians(ng)
+            x = elev.center.x + radii * np.cos(angle)
+            y = elev.center.y + radii * np.sin(angle)
+            ray = np.column_stack([x, y]).tolist()
+            values = [elev.sampler.value(p) for p in ray]
+            top = values.index(max(values[: len(line)]))
+            assert np.allclose(line, ray[: len(line)])
+            assert all(v >= elev.min_elev for v in values[top : len(line)])
+            if len(line) < len(ray):
+                assert values[len(line)] < elev.min_elev
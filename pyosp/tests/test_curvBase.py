@@ -2,6 +2,8 @@
 
 import pytest
 import os, sys
+import numpy as np
+import pyosp
 from pyosp import point_coords
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -39,3 +41,140 @@ class TestBaseHomo:
         start_ind, end_ind = base._segment(start_distance, end_distance)
         assert abs(start_ind - len(base.distance) / 4) <= 3
         assert abs(end_ind - len(base.distance) / 2) <= 3
+
+    def test_line_points(self, base_homo):
+        """Stations equal to interpolating the baseline one by one"""
+        base = base_homo(line_stepsize=3.3, cross_stepsize=None)
+        expected = [
+            base.line.interpolate(base.line_stepsize * i).coords[0]
+            for i in range(len(base.distance))
+        ]
+        assert base.line_p == expected
+        assert np.array_equal(base.line_tangents[:-1], np.diff(base.line_xy, axis=0))
+
+    def test_run_stats(self, base_homo, orig_homo):
+        """Phases, reads and progress are reported"""
+        calls = []
+        orig = orig_homo(progress=lambda current, total: calls.append(current))
+        assert calls == []
+        orig.swath
+        assert calls[-1] == len(orig.line_p)
+
+        stats = orig.run_stats
+        assert list(stats.phase_time) == ["stations", "transects", "sampling"]
+        assert stats.reads == 1
+        assert stats.read_bytes == orig.raster.ReadAsArray().nbytes
+        assert stats.points >= sum(len(line) for line in orig.lines)
+
+        base = base_homo(cache_size=2 ** 20, progress=False, run_stats=stats)
+        base.slope_grid.value(orig.line_p[0])
+        assert stats.phase_calls["slope"] == 1
+        assert stats.phase_calls["read"] >= 1
+        assert stats.reads > 1
+
+    def test_transect_offsets(self, base_homo):
+        """Offsets are on the left normal, also for horizontal and vertical segments"""
+        base = base_homo(line_stepsize=None, cross_stepsize=None)
+        tangents = np.array([[1, 0], [-1, 0], [0, 1], [0, -1], [3, 4]], dtype=float)
+        offsets = base._transect_offsets(tangents, [1.0, 2.0])
+
+        expected = np.array([[0, 1], [0, -1], [-1, 0], [1, 0], [-0.8, 0.6]])
+        assert np.allclose(offsets[:, 0], expected)
+        assert np.allclose(offsets[:, 1], 2 * expected)
+
+
+class TestRaggedSwath:
+    def test_views(self, elev_homo):
+        """Nested lists are views of the flat arrays"""
+        elev = elev_homo()
+        swath = elev.swath
+        assert len(swath) == len(elev.lines) == len(elev.dat)
+        assert swath.to_dat() == elev.dat
+        for line, base_index in zip(elev.lines, swath.base_index):
+            tuples = [i for i, point in enumerate(line) if isinstance(point, tuple)]
+            assert tuples == ([base_index] if base_index >= 0 else [])
+
+        half = len(swath) // 2
+        joined = pyosp.Ragged_swath.concatenate([swath.take(0, half), swath.take(half)])
+        assert np.array_equal(joined.xy, swath.xy)
+        assert np.array_equal(joined.offsets, swath.offsets)
+        assert np.array_equal(joined.values, swath.values, equal_nan=True)
+        assert np.array_equal(swath.line_values(half), elev.dat[half])
+
+    def test_swath_stat(self, elev_homo):
+        """One-pass statistics match the NaN-aware numpy functions"""
+        elev = elev_homo()
+        stat = elev.swath_stat(stats=("min", "max", "mean", "std", "count"))
+        lines = [np.asarray(x, dtype=float) for x in elev.dat]
+        with np.errstate(invalid="ignore"):
+            for name, func in [
+                ("min", np.nanmin),
+                ("max", np.nanmax),
+                ("mean", np.nanmean),
+                ("std", np.nanstd),
+                ("p25", lambda x: np.nanpercentile(x, 25)),
+            ]:
+                expected = [func(x) if np.isfinite(x).any() else np.nan for x in lines]
+                assert np.allclose(stat[name], expected, equal_nan=True)
+        assert np.array_equal(stat["count"], [np.isfinite(x).sum() for x in lines])
+        stat = elev.profile_stat(elev.dat)
+        assert np.allclose(stat, elev.profile_stat(), equal_nan=True)
+
+    def test_segments(self, elev_homo):
+        """Segments are built on demand and equal to parts of the whole swath"""
+        elev = elev_homo()
+        poly = elev.out_polygon(start=100, end=500)
+        stat = elev.swath_stat(start=100, end=500)
+        cross = elev.cross_dat(start=100, end=500)
+        assert elev._swath is None and len(elev._segments) == 1
+
+        whole = elev_homo()
+        start_ind, end_ind = whole._segment(100, 500)
+        assert whole.swath is not None
+        assert poly.equals(whole.out_polygon(start=100, end=500))
+        for name, val in whole.swath_stat().items():
+            assert np.allclose(stat[name], val[start_ind:end_ind], equal_nan=True)
+        assert np.array_equal(
+            cross["cross_matrix"],
+            whole.cross_dat(start=100, end=500)["cross_matrix"],
+            equal_nan=True,
+        )
+
+    def test_result_cache(self, elev_homo, tmp_path):
+        """Swaths are loaded from the cache directory when built again"""
+        elev = elev_homo(cache_dir=str(tmp_path), progress=False)
+        assert elev.swath is not None
+        assert "transects" in elev.run_stats.phase_time
+
+        again = elev_homo(cache_dir=str(tmp_path), progress=False)
+        assert again.lines == elev.lines
+        assert again.dat == elev.dat
+        assert "transects" not in again.run_stats.phase_time
+
+        other = elev_homo(cache_dir=str(tmp_path), progress=False, cross_stepsize=20)
+        assert other.swath is not None
+        assert "transects" in other.run_stats.phase_time
+        assert len(os.listdir(str(tmp_path))) == 2
+
+        cache = pyosp.Result_cache(str(tmp_path), max_bytes=1)
+        cache.evict()
+        assert cache.nbytes == 0
+
+    def test_npz(self, tpi_homo, tmp_path):
+        """Swath profiles are rebuilt from files without the raster"""
+        tpi = tpi_homo(progress=False)
+        out_file = str(tmp_path / "tpi.npz")
+        tpi.to_npz(out_file)
+
+        loaded = pyosp.Base_curv.from_file(out_file)
+        assert isinstance(loaded, pyosp.Tpi_curv) and loaded.raster is None
+        assert (loaded.tpi_radius, loaded.min_tpi) == (tpi.tpi_radius, tpi.min_tpi)
+        assert loaded.lines == tpi.lines
+        assert loaded.dat == tpi.dat
+        assert np.allclose(loaded.profile_stat(), tpi.profile_stat(), equal_nan=True)
+        assert loaded.out_polygon().equals(tpi.out_polygon())
+
+        columns = np.load(out_file)
+        assert np.array_equal(columns["distance"], tpi.distance)
+        assert np.array_equal(columns["offsets"], tpi.swath.offsets)
+        assert np.allclose(columns["stat_p75"], tpi.profile_stat()[4], equal_nan=True)
@@ -70,6 +70,10 @@ class TestPost:
         assert all(
             [a == b for a, b in zip(cross_dat["distance"], data_valid["distance"])]
         )
+        assert np.asarray(cross_dat["cross_matrix"]).shape == (
+            len(data_valid["distance"]),
+            len(data_valid["cross_matrix"][0]),
+        )
         # assert all(
         #     [
         #         a == b
@@ -132,3 +136,57 @@ class TestPost:
         mean_post = np.nanmean(np.hstack(post_dat[1][50]))
         assert all([a == b for a, b in zip(post_dat[0], data_valid[0])])
         assert mean_valid == mean_post
+
+    def test_post_repeat(self, orig_homo):
+        """Filtering again reuses the sampled slopes, equal to per-point values"""
+        orig = orig_homo(progress=False)
+        post_dat = orig.post_slope(min_val=2, max_val=10, start=100, end=300)
+        start_ind, end_ind = orig._segment(100, 300)
+        lines = orig._segment_lines(start_ind, end_ind)
+        for line, values in zip(lines, post_dat[1]):
+            for point, value in zip(line, values):
+                if 2 <= orig.slope_grid.value(point) <= 10:
+                    assert value == orig.sampler.value(point)
+                else:
+                    assert np.isnan(value)
+
+        again = orig.post_slope(min_val=5, max_val=10, start=100, end=300)
+        assert len(orig._attributes) == 1
+        assert np.nansum(np.hstack(again[1])) < np.nansum(np.hstack(post_dat[1]))
+
+    def test_post_filter(self, orig_homo):
+        """A fused filter equals chaining the single-criterion filters"""
+        orig = orig_homo(progress=False)
+        ranges = {"elev": (5, 20), "slope": (2, 10), ("tpi", 50): (0, 100)}
+        distance, values, mask = orig.post_filter(ranges, start=100, end=300)
+
+        elev = orig.post_elev(min_val=5, max_val=20, start=100, end=300)[1]
+        slope = orig.post_slope(min_val=2, max_val=10, start=100, end=300)[1]
+        tpi = orig.post_tpi(radius=50, min_val=0, max_val=100, start=100, end=300)[1]
+        for line, line_mask, *single in zip(values, mask, elev, slope, tpi):
+            kept = np.all([~np.isnan(x) for x in single], axis=0)
+            assert np.array_equal(line_mask, kept)
+            expected = np.where(kept, single[0], np.nan)
+            assert np.array_equal(line, expected, equal_nan=True)
+
+        cross = orig.post_filter(ranges, start=100, end=300, cross=True)
+        assert cross[2].shape == cross[1].shape
+        assert np.array_equal(np.isnan(cross[1]), ~cross[2])
+
+    def test_density_image(self, orig_homo):
+        """Large swaths render as an image, or as a subset of points"""
+        orig = orig_homo()
+        ax = orig.density_scatter(bins=20, image=True, cmap="jet")
+        assert len(ax.collections) == 1
+        assert ax.collections[0].get_array().size == 20 * 20
+
+        ax = orig.density_scatter(bins=20, max_points=500, s=1)
+        assert len(ax.collections[0].get_offsets()) == 500
+
+    def test_density_single_bin(self):
+        """A single bin gives its count to every point, nearby or not"""
+        from pyosp.curvsp.base_curv import _grid_linear
+
+        edges = np.array([0.0, 1.0])
+        z = _grid_linear(np.array([[5.0]]), edges, edges, [0.2, 3.0], [0.5, -2.0])
+        assert np.array_equal(z, [5.0, 5.0])
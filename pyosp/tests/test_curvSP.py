@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 import os, sys
 import pyosp
 import numpy as np
@@ -138,3 +139,147 @@ class TestCurv:
 
         assert all(i >= -5 for i in p_dat_in)
         assert all(i < -5 for i in p_dat_out)
+
+    def test_chunks(self, orig_homo, slope_homo):
+        """Transects do not depend on how many stations are evaluated at once"""
+        orig = orig_homo()
+        lines = orig._transect_lines(chunk_size=1000)
+        assert lines.to_lines(orig.line_p) == orig.lines
+        assert np.array_equal(lines.offsets, orig.swath.offsets)
+
+        slope = slope_homo()
+        lines = slope._threshold_lines(
+            slope.slope_grid.values,
+            slope.min_slope,
+            slope.max_slope,
+            strict=True,
+            chunk_size=1000,
+        )
+        assert lines.to_lines(slope.line_p) == slope.lines
+        assert np.array_equal(lines.offsets, slope.swath.offsets)
+
+        # swept transects are cut from candidates of the same chunks
+        candidates = slope._sweep_candidates(chunk_size=1000)
+        assert len(candidates["chunks"]) > 1
+        lines = slope._sweep_lines(candidates)
+        assert lines.to_lines(slope.line_p) == slope.lines
+
+    def test_n_jobs(self, tpi_homo):
+        """Transects built in a process pool equal to the serial ones"""
+        tpi = tpi_homo()
+        tpi_jobs = tpi_homo(n_jobs=2)
+        assert tpi_jobs.lines == tpi.lines
+        assert tpi_jobs.dat == tpi.dat
+        assert tpi_jobs.run_stats.points >= tpi.run_stats.points
+
+        # profiles are not thread-safe, chunks only run in processes
+        with ThreadPoolExecutor(2) as executor:
+            with pytest.raises(TypeError):
+                tpi_homo(n_jobs=2, executor=executor).dat
+
+    def test_stream_stats(self, tpi_homo):
+        """Streamed statistics equal to the ones of the kept swath data"""
+        tpi = tpi_homo()
+        stream = tpi_homo(stream_stats=True, n_jobs=2)
+        names = ("min", "max", "mean", "std", "count")
+        expected = tpi.swath_stat(stats=names, percentiles=(25, 50, 75))
+        stat = stream.swath_stat(stats=names, percentiles=(25, 50, 75))
+        for name in names:
+            assert np.allclose(stat[name], expected[name], equal_nan=True)
+
+        # each estimated quantile is within one histogram bin of numpy's one
+        sketch = stream.sketch
+        width = (sketch.hi - sketch.lo) / sketch.bins
+        for q in (25, 50, 75):
+            for est, line in zip(stat["p{}".format(q)], tpi.dat):
+                line = np.asarray(line)
+                line = line[~np.isnan(line)]
+                if len(line):
+                    assert abs(est - np.percentile(line, q)) < width
+        with pytest.raises(ValueError):
+            stream.dat
+
+        # bins span a given value range instead of the raster's one
+        narrow = tpi_homo(stream_stats=True, value_range=(-5.0, 5.0))
+        assert (narrow.sketch.lo, narrow.sketch.hi) == (-5.0, 5.0)
+        stat = narrow.swath_stat(stats=names)
+        for name in names:
+            assert np.allclose(stat[name], expected[name], equal_nan=True)
+
+    def test_value_hist(self, tpi_homo):
+        """Histograms binned chunk by chunk, or merged from workers, are exact"""
+        tpi = tpi_homo()
+        values = tpi.swath.values
+        counts, edges = np.histogram(values[~np.isnan(values)], bins=40)
+        histogram = tpi.value_hist(bins=40)
+        assert np.array_equal(histogram.edges, edges)
+        assert np.array_equal(histogram.counts, counts)
+
+        edges = np.linspace(-10, 60, 71)
+        expected = tpi.value_hist(bins=edges).counts
+        for n_jobs in (None, 2):
+            stream = tpi_homo(stream_stats=True, n_jobs=n_jobs)
+            assert np.array_equal(stream.value_hist(bins=edges).counts, expected)
+
+        half = len(values) // 2
+        parts = [pyosp.Value_histogram(edges) for _ in range(2)]
+        parts[0].update(values[:half])
+        parts[1].update(values[half:])
+        assert np.array_equal(parts[0].merge(parts[1]).counts, expected)
+
+    def test_sweep(self):
+        """Swept profiles equal to the ones constructed one by one"""
+        line = os.path.join(dat, "homo_baseline.shp")
+        raster = os.path.join(dat, "homo_mount.tif")
+        results = pyosp.Slope_curv.sweep(
+            line, raster, [60, 100], min_slope=[1, 5], max_slope=40, progress=False
+        )
+        assert list(results) == [(60, 1, 40), (60, 5, 40), (100, 1, 40), (100, 5, 40)]
+        for (width, min_slope, max_slope), slope in results.items():
+            expected = pyosp.Slope_curv(
+                line, raster, width, min_slope=min_slope, max_slope=max_slope
+            )
+            assert slope.lines == expected.lines
+            assert slope.dat == expected.dat
+        with pytest.raises(ValueError):
+            pyosp.Slope_curv.sweep(line, raster, None, min_slope=[1, 5])
+
+    def test_batch(self, tmp_path):
+        """Profiles of every feature equal to the ones constructed one by one"""
+        from osgeo import ogr
+
+        names = ["homo_baseline", "homo_baselineOffset"]
+        raster = os.path.join(dat, "homo_mount.tif")
+        lines = [pyosp.read_shape(os.path.join(dat, name + ".shp")) for name in names]
+
+        multi = str(tmp_path / "multi.shp")
+        ds = ogr.GetDriverByName("Esri Shapefile").CreateDataSource(multi)
+        layer = ds.CreateLayer("", None, ogr.wkbLineString)
+        layer.CreateField(ogr.FieldDefn("name", ogr.OFTString))
+        for name, line in zip(names, lines):
+            feat = ogr.Feature(layer.GetLayerDefn())
+            feat.SetField("name", name)
+            feat.SetGeometry(ogr.CreateGeometryFromWkb(line.wkb))
+            layer.CreateFeature(feat)
+        ds = layer = feat = None
+
+        for n_jobs in (None, 2):
+            results = list(
+                pyosp.Elev_curv.batch(
+                    multi, raster, 100, min_elev=0.01, n_jobs=n_jobs, progress=False
+                )
+            )
+            assert [fid for fid, _, _ in results] == [0, 1]
+            for (_, attrs, elev), name, line in zip(results, names, lines):
+                expected = pyosp.Elev_curv(line, raster, 100, min_elev=0.01)
+                assert attrs["name"] == name
+                assert elev.lines == expected.lines
+                assert elev.dat == expected.dat
+
+        # slope tiles are computed once for all features
+        results = pyosp.Slope_curv.batch(
+            multi, raster, 100, min_slope=1, progress=False
+        )
+        slopes = [slope for _, _, slope in results]
+        assert all(slope.swath is not None for slope in slopes)
+        assert slopes[0].slope_grid is slopes[1].slope_grid
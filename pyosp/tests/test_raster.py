@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import os, sys
+import numpy as np
+from osgeo import gdal
+import pyosp
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+dat = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../datasets/")
+
+homo_raster = os.path.join(dat, "homo_mount.tif")
+crater_raster = os.path.join(dat, "crater.tif")
+
+
+def random_points(raster, n=200, seed=0):
+    "Random points on the raster, plus a few outside of it."
+    geoTransform = raster.GetGeoTransform()
+    xmax = geoTransform[0] + geoTransform[1] * raster.RasterXSize
+    ymin = geoTransform[3] + geoTransform[5] * raster.RasterYSize
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(geoTransform[0], xmax, n)
+    y = rng.uniform(ymin, geoTransform[3], n)
+    return np.column_stack((x, y))
+
+
+class TestSampler:
+    def test_values(self):
+        """Batched values equal to the per-point reads"""
+        raster = gdal.Open(homo_raster)
+        points = random_points(raster)
+        expected = [pyosp.Point_elevation(p, raster).value[0, 0] for p in points]
+
+        for in_memory in (True, False):
+            sampler = pyosp.Raster_sampler(raster, in_memory=in_memory)
+            assert np.array_equal(sampler.values(points), expected)
+            assert sampler.value(points[0]) == expected[0]
+
+    def test_default(self):
+        """Small rasters stay in memory with their data type, large ones are cached"""
+        raster = gdal.Open(homo_raster)
+        points = random_points(raster)
+        expected = [pyosp.Point_elevation(p, raster).value[0, 0] for p in points]
+
+        sampler = pyosp.Raster_sampler(raster)
+        assert sampler.in_memory and sampler.cache is None
+        assert np.array_equal(sampler.values(points), expected)
+        assert sampler.array.dtype == raster.ReadAsArray(0, 0, 1, 1).dtype
+
+        sampler = pyosp.Raster_sampler(raster, max_bytes=2 ** 10)
+        assert not sampler.in_memory and sampler.cache is not None
+        assert np.array_equal(sampler.values(points), expected)
+
+    def test_outside(self):
+        """Points off the raster are NaN"""
+        raster = gdal.Open(homo_raster)
+        geoTransform = raster.GetGeoTransform()
+        sampler = pyosp.Raster_sampler(raster)
+        points = [
+            [geoTransform[0] - 5 * geoTransform[1], geoTransform[3]],
+            [geoTransform[0], geoTransform[3] + 5 * geoTransform[1]],
+            [np.nan, np.nan],
+        ]
+        assert np.isnan(sampler.values(points)).all()
+
+    def test_memmap(self, tmp_path):
+        """Values mapped from the sidecar equal to the per-point reads"""
+        raster = gdal.Open(homo_raster)
+        points = random_points(raster)
+        expected = [pyosp.Point_elevation(p, raster).value[0, 0] for p in points]
+
+        sidecar = str(tmp_path / "homo_mount.npy")
+        sampler = pyosp.Raster_sampler(raster, memmap=sidecar)
+        assert np.array_equal(sampler.values(points), expected)
+        assert isinstance(sampler.array, np.memmap)
+        assert not sampler.array.flags.writeable
+        window = raster.ReadAsArray(10, 20, 30, 40)
+        assert np.array_equal(sampler.read(10, 20, 30, 40), window)
+
+        # the sidecar is reused once written
+        mtime = os.path.getmtime(sidecar)
+        sampler = pyosp.Raster_sampler(raster, memmap=sidecar)
+        assert np.array_equal(sampler.values(points), expected)
+        assert os.path.getmtime(sidecar) == mtime
+
+
+class TestTileCache:
+    def test_read(self):
+        """Windows and point values assembled from tiles equal to GDAL reads"""
+        raster = gdal.Open(homo_raster)
+        cache = pyosp.Tile_cache(raster, max_bytes=2 ** 20, min_tile=16)
+        cols, rows = raster.RasterXSize, raster.RasterYSize
+        full = raster.ReadAsArray().astype(float)
+        assert np.array_equal(cache.read(0, 0, cols, rows), full)
+        assert np.array_equal(cache.read(7, 13, 41, 29), full[13:42, 7:48])
+
+        sampler = pyosp.Raster_sampler(raster, cache=cache)
+        points = random_points(raster)
+        assert np.array_equal(
+            sampler.values(points), pyosp.Raster_sampler(raster).values(points)
+        )
+
+    def test_budget(self):
+        """Cache never holds more than its budget, and counts hits and misses"""
+        raster = gdal.Open(homo_raster)
+        cache = pyosp.Tile_cache(raster, min_tile=16)
+        # room for two full tiles
+        cache.max_bytes = 2 * cache.tile_xsize * cache.tile_ysize * 8
+        cache.read(0, 0, raster.RasterXSize, raster.RasterYSize)
+        assert cache.nbytes <= cache.max_bytes
+        assert cache.hits == 0
+
+        misses = cache.misses
+        cache.read(raster.RasterXSize - 5, raster.RasterYSize - 5, 5, 5)
+        assert cache.hits == 1
+        assert cache.misses == misses
+
+    def test_windows(self):
+        """Slope and TPI read through the cache equal to whole-raster reads"""
+        raster = gdal.Open(homo_raster)
+        cache = pyosp.Tile_cache(raster, max_bytes=2 ** 20, min_tile=16)
+        sampler = pyosp.Raster_sampler(raster, cache=cache)
+        cell_size = raster.GetGeoTransform()[1]
+        for p in random_points(raster, n=20):
+            assert pyosp.Geo_slope(p, raster, cell_size, sampler).value == (
+                pyosp.Geo_slope(p, raster, cell_size).value
+            )
+            assert pyosp.Tpi(p, raster, 20, sampler).value == (
+                pyosp.Tpi(p, raster, 20).value
+            )
+
+
+class TestSlopeGrid:
+    def test_values(self):
+        """Slope grid equal to the per-point slope, also across small tiles"""
+        raster = gdal.Open(homo_raster)
+        sampler = pyosp.Raster_sampler(raster)
+        cell_size = raster.GetGeoTransform()[1]
+        points = random_points(raster, n=100)
+        expected = [pyosp.Geo_slope(p, raster, cell_size).value for p in points]
+
+        grid = pyosp.Slope_grid(sampler, cell_size)
+        assert np.array_equal(grid.values(points), expected)
+
+        grid = pyosp.Slope_grid(sampler, cell_size, tile_size=32)
+        assert np.array_equal(grid.values(points), expected)
+
+
+class TestTpiGrid:
+    def test_values(self):
+        """TPI grid equal to the per-point TPI for several radii"""
+        raster = gdal.Open(crater_raster)
+        sampler = pyosp.Raster_sampler(raster)
+        cell_size = raster.GetGeoTransform()[1]
+        points = random_points(raster, n=100)
+        for radius in [cell_size * 3, cell_size * 50]:
+            expected = [pyosp.Tpi(p, raster, radius).value for p in points]
+            grid = pyosp.Tpi_grid(sampler, radius, tile_size=64)
+            assert np.allclose(grid.values(points), np.ravel(expected))
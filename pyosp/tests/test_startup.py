@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import os, sys
+import json
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+dat = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../datasets/")
+
+# run in a fresh interpreter, so modules imported by other tests do not count
+SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import numpy, shapely.geometry
+from osgeo import gdal, ogr
+deps = time.perf_counter()
+import pyosp
+imported = time.perf_counter()
+matplotlib_imported = "matplotlib" in sys.modules
+
+elev = pyosp.Elev_curv(sys.argv[1], sys.argv[2], 100, min_elev=0.01, progress=False)
+elev.swath_stat()
+built = time.perf_counter()
+print(
+    json.dumps(
+        {
+            "imported": matplotlib_imported,
+            "built": "matplotlib" in sys.modules,
+            "times": {
+                "deps": deps - start,
+                "pyosp": imported - deps,
+                "swath": built - imported,
+            },
+        }
+    )
+)
+"""
+
+
+class TestStartup:
+    def test_headless(self, record_property):
+        """Importing pyosp and building swaths do not import matplotlib.
+
+        Import and construction times are reported as a benchmark, not
+        checked, as they depend on the host.
+        """
+        line = os.path.join(dat, "homo_baseline.shp")
+        raster = os.path.join(dat, "homo_mount.tif")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.run(
+            [sys.executable, "-c", SCRIPT, line, raster],
+            env=env,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        result = json.loads(out.stdout.decode().splitlines()[-1])
+        for name, seconds in result.pop("times").items():
+            record_property("startup_{}_seconds".format(name), seconds)
+            print("startup {}: {:.3f} s".format(name, seconds))
+        assert result == {"imported": False, "built": False}
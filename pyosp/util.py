@@ -4,15 +4,20 @@ __all__ = [
     "pairwise",
     "grouped",
     "read_shape",
+    "read_features",
     "point_coords",
     "write_polygon",
     "write_polylines",
+    "write_npz",
+    "read_npz",
     "progressBar",
+    "line_stations",
 ]
 
 from osgeo import ogr
 import json
 import itertools
+import numpy as np
 from shapely.geometry import shape
 import sys
 
@@ -40,6 +45,21 @@ def read_shape(shapefile):
     return outshape
 
 
+def read_features(shapefile):
+    """Yield every feature of a shapefile.
+
+    :param shapefile: path to shapefile
+    :type shapefile: str
+    :return: feature ID, attributes and shapely object of each feature
+    :rtype: generator of tuple
+    """
+    file = ogr.Open(shapefile)
+    layer = file.GetLayer(0)
+    for feature in layer:
+        read = json.loads(feature.ExportToJson())
+        yield feature.GetFID(), read["properties"], shape(read["geometry"])
+
+
 def point_coords(shapefile):
     "Return coordinates from point(s) shapefile"
     file = ogr.Open(shapefile)
@@ -110,6 +130,48 @@ def write_polylines(poly, out_file):
     ds = layer = feat = geom = None
 
 
+def write_npz(arrays, meta, out_file):
+    """Write named arrays and their metadata to an uncompressed .npz file.
+
+    :param arrays: arrays to write, one column each
+    :type arrays: dict of array-like
+    :param meta: metadata, serialized as JSON
+    :type meta: dict
+    :param out_file: file path to restore arrays
+    :type out_file: str
+    """
+    # numpy scalars are written as the Python numbers they hold
+    meta = json.dumps(meta, default=lambda obj: obj.item())
+    arrays = dict(arrays, meta=np.array(meta))
+    with open(out_file, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def read_npz(in_file):
+    """Read arrays and metadata written by write_npz.
+
+    :param in_file: file path of arrays
+    :type in_file: str
+    :return: arrays by name, and metadata
+    :rtype: tuple of dict
+    """
+    with np.load(in_file) as data:
+        arrays = {name: data[name] for name in data.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    return arrays, meta
+
+
+def subclass_named(base, name):
+    "Return base or its subclass called name."
+    classes = [base]
+    while classes:
+        cls = classes.pop()
+        if cls.__name__ == name:
+            return cls
+        classes.extend(cls.__subclasses__())
+    raise ValueError("{} is not a subclass of {}".format(name, base.__name__))
+
+
 def progressBar(current, total, width=25):
     """Progress bar, call inside of iteration.
 
@@ -128,3 +190,44 @@ def progressBar(current, total, width=25):
 
     sys.stdout.write(text)
     sys.stdout.flush()
+
+
+def line_stations(line, stepsize):
+    """Return stations spaced by stepsize along a line, and their directions.
+
+    Cumulative segment lengths are computed once and all stations are placed
+    by binary search and linear interpolation, instead of walking the line
+    from the start for each station.
+
+    :param line: baseline
+    :type line: shapely LineString or (M, 2) array-like
+    :param stepsize: distance between stations along the line
+    :type stepsize: float
+    :return: station coordinates, and vectors from each station to the next,
+        the last station repeating the previous vector
+    :rtype: (N, 2) ndarray, (N, 2) ndarray
+    """
+    coords = np.asarray(getattr(line, "coords", line), dtype=float)[:, :2]
+    seg = np.diff(coords, axis=0)
+    seg_len = np.sqrt(seg[:, 0] * seg[:, 0] + seg[:, 1] * seg[:, 1])
+    cum_len = np.concatenate([[0.0], np.cumsum(seg_len)])
+
+    nPoints = int(getattr(line, "length", cum_len[-1]) // stepsize)
+    distance = stepsize * np.arange(nPoints + 1)
+
+    # segment of each station, zero-length segments are never chosen
+    ind = np.searchsorted(cum_len, distance, side="right") - 1
+    ind = np.clip(ind, 0, max(len(seg) - 1, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = (distance - cum_len[ind]) / seg_len[ind]
+    frac = np.where(np.isfinite(frac), np.clip(frac, 0.0, 1.0), 0.0)
+    if len(seg):
+        points = coords[ind] + frac[:, None] * seg[ind]
+    else:
+        points = coords[:1].repeat(len(distance), axis=0)
+
+    if len(points) < 2:
+        return points, np.zeros_like(points)
+    tangents = np.diff(points, axis=0)
+    tangents = np.vstack([tangents, tangents[-1:]])
+    return points, tangents